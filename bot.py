@@ -8,6 +8,22 @@ from discord import app_commands
 
 import platform
 
+from utils.config_store import ConfigStore
+
+from utils.content import meme_buffer, quote_buffer
+
+from utils.coordinator import Coordinator
+
+from utils.database import Database
+
+from utils.delivery import Deliverer
+
+from utils.http import HttpClient
+
+from utils.search import TitleIndex
+
+from utils.sharding import cluster_name, parse_shard_ids, shard_for
+
 load_dotenv()
 
 TOKEN = os.getenv("BOT_TOKEN")
@@ -18,12 +34,104 @@ intents.message_content = True
 
 intents.guilds = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Sharding: SHARDING=auto runs every shard in this process (AutoShardedBot).
+# For several processes, give each SHARD_COUNT (the cluster total) and its own
+# SHARD_IDS range, e.g. "0-3" and "4-7"; they coordinate through the shared DB.
+
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS"))
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None
+
+SHARDED = os.getenv("SHARDING", "").lower() in ("1", "true", "auto") or bool(SHARD_IDS or SHARD_COUNT)
+
+if SHARD_IDS and not SHARD_COUNT:
+
+    raise SystemExit("SHARD_IDS needs SHARD_COUNT (total shards across all processes)")
+
+class MangaBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+
+    # Whether this process serves the guild (always true unless it runs a subset of shards)
+
+    def owns_guild(self, guild_id):
+
+        shard_ids = getattr(self, "shard_ids", None)
+
+        if not shard_ids or not self.shard_count:
+
+            return True
+
+        return shard_for(guild_id, self.shard_count) in shard_ids
+
+    async def close(self):
+
+        # Unloads the cogs first, so no loop or scheduled job still uses the session or the DB
+
+        await super().close()
+
+        # Let another process take over the upstream polls right away
+
+        if getattr(self, "coordinator", None):
+
+            await self.coordinator.release_all()
+
+        # Release pooled connections, then flush and close the DB
+
+        if getattr(self, "http_client", None):
+
+            await self.http_client.close()
+
+        if getattr(self, "db", None):
+
+            await self.db.close()
+
+shard_options = {"shard_count": SHARD_COUNT, "shard_ids": SHARD_IDS} if SHARDED else {}
+
+bot = MangaBot(command_prefix="!", intents=intents, **shard_options)
 
 @bot.event
 
 async def setup_hook():
 
+    # One pooled HTTP client shared by every cog
+
+    bot.http_client = HttpClient(
+
+        total_timeout=float(os.getenv("HTTP_TIMEOUT", 15)),
+
+        connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)),
+
+        limit_per_host=int(os.getenv("HTTP_LIMIT_PER_HOST", 10))
+
+    )
+
+    await bot.http_client.start()
+
+    # SQLite state (migrates config/*.json on first run); config is cached in memory
+
+    bot.db = Database(os.getenv("DB_PATH", os.path.join("config", "bot.db")))
+
+    await bot.db.open()
+
+    bot.config = await ConfigStore(bot.db).load()
+
+    # Leases/outbox so upstream feeds are polled once per cluster, not once per process
+
+    bot.coordinator = Coordinator(bot.db, name=cluster_name(SHARD_IDS))
+
+    # Local fuzzy title index, fed by the Jikan/MangaDex responses the cogs see
+
+    bot.search_index = TitleIndex(maxsize=int(os.getenv("SEARCH_INDEX_SIZE", 2000)))
+
+    # Bounded concurrent fan-out for autopost deliveries
+
+    bot.delivery = Deliverer(concurrency=int(os.getenv("DELIVERY_CONCURRENCY", 10)))
+
+    # Shared meme/quote buffers, filled in batches and drawn from by every guild
+
+    bot.memes = meme_buffer(bot.http_client)
+
+    bot.quotes = quote_buffer(bot.http_client)
+
     # Load all cogs dynamically from the cogs/ folder
 
     for file in os.listdir("cogs"):
@@ -40,11 +148,13 @@ async def setup_hook():
 
                 print(f"❌ Failed to load {file}: {type(e).__name__}: {e}")
 
-    # Sync slash commands globally
+    # Sync slash commands globally (once per cluster: the process running shard 0)
 
-    synced = await bot.tree.sync()
+    if not SHARD_IDS or 0 in SHARD_IDS:
 
-    print(f"🔁 Synced {len(synced)} slash commands globally.")
+        synced = await bot.tree.sync()
+
+        print(f"🔁 Synced {len(synced)} slash commands globally.")
 
 @bot.event
 
@@ -58,7 +168,17 @@ async def on_ready():
 
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
 
-    if isinstance(error, app_commands.CheckFailure):
+    if isinstance(error, app_commands.NoPrivateMessage):
+
+        await interaction.response.send_message(
+
+            "🚫 This command can only be used in a server.",
+
+            ephemeral=True
+
+        )
+
+    elif isinstance(error, app_commands.CheckFailure):
 
         await interaction.response.send_message(
 
@@ -1,4 +1,4 @@
-import discord, os, json, platform
+import discord, os, platform
 
 from discord.ext import commands
 
@@ -8,9 +8,7 @@ from datetime import datetime
 
 from utils.admin_config import is_admin
 
-CONFIG_FILE = os.path.join("config", "autopost_config.json")
-
-ADMIN_CONFIG = os.path.join("config", "admin_roles.json")
+from utils.embeds import embed_cache_stats
 
 class Admin(commands.Cog):
 
@@ -32,113 +30,79 @@ class Admin(commands.Cog):
 
             return await interaction.followup.send("❌ Use: meme, quote, or insta")
 
-        data = {}
-
-        if os.path.exists(CONFIG_FILE):
-
-            with open(CONFIG_FILE) as f:
-
-                data = json.load(f)
+        await self.bot.config.set_channel(interaction.guild.id, f"{type}_channel", channel.id)
 
-        gid = str(interaction.guild.id)
+        autopost = self.bot.get_cog("Autopost")
 
-        data.setdefault(gid, {})[f"{type}_channel"] = channel.id
+        if autopost:
 
-        with open(CONFIG_FILE, "w") as f:
-
-            json.dump(data, f, indent=2)
+            autopost.sync_guild(interaction.guild.id)
 
         await interaction.followup.send(f"✅ `{type}` channel set to {channel.mention}")
 
     @is_admin()
 
-    @app_commands.command(name="setadminrole", description="🛡️ Set admin role for this server")
+    @app_commands.command(name="setadminrole", description="🛡️ Add an admin role for this server")
 
     async def setadminrole(self, interaction: discord.Interaction, role: discord.Role):
 
         await interaction.response.defer(ephemeral=True)
 
-        gid = str(interaction.guild.id)
-
-        data = {}
-
-        if os.path.exists(ADMIN_CONFIG):
-
-            with open(ADMIN_CONFIG) as f:
+        if not await self.bot.config.add_admin_role(interaction.guild.id, role.id):
 
-                data = json.load(f)
+            return await interaction.followup.send(f"ℹ️ {role.mention} is already an admin role.")
 
-        data[gid] = role.id
-
-        with open(ADMIN_CONFIG, "w") as f:
-
-            json.dump(data, f, indent=2)
-
-        await interaction.followup.send(f"✅ Admin role set to {role.mention}")
+        await interaction.followup.send(f"✅ {role.mention} added as an admin role")
 
     @is_admin()
 
-    @app_commands.command(name="listadminroles", description="🔍 Show the current admin role")
+    @app_commands.command(name="listadminroles", description="🔍 Show the current admin roles")
 
     async def listadminroles(self, interaction: discord.Interaction):
 
         await interaction.response.defer(ephemeral=True)
 
-        gid = str(interaction.guild.id)
-
-        if not os.path.exists(ADMIN_CONFIG):
+        rids = self.bot.config.get_admin_roles(interaction.guild.id)
 
-            return await interaction.followup.send("⚠️ No admin config file found.")
+        if not rids:
 
-        with open(ADMIN_CONFIG) as f:
+            return await interaction.followup.send("ℹ️ No admin role has been set for this server.")
 
-            data = json.load(f)
+        lines = []
 
-        rid = data.get(gid)
-
-        if rid:
+        for rid in sorted(rids):
 
             role = interaction.guild.get_role(rid)
 
-            if role:
-
-                return await interaction.followup.send(f"🛡️ Admin role: {role.mention}")
-
-            return await interaction.followup.send(f"🛡️ Admin role ID: `{rid}` (not found in this server)")
+            lines.append(f"• {role.mention}" if role else f"• ID `{rid}` (not found in this server)")
 
-        await interaction.followup.send("ℹ️ No admin role has been set for this server.")
+        await interaction.followup.send("🛡️ Admin roles:\n" + "\n".join(lines))
 
     @is_admin()
 
-    @app_commands.command(name="removeadminrole", description="❌ Remove admin role restriction")
+    @app_commands.command(name="removeadminrole", description="❌ Remove one admin role, or all of them")
 
-    async def removeadminrole(self, interaction: discord.Interaction):
+    async def removeadminrole(self, interaction: discord.Interaction, role: discord.Role = None):
 
         await interaction.response.defer(ephemeral=True)
 
-        gid = str(interaction.guild.id)
+        if role is None:
 
-        if not os.path.exists(ADMIN_CONFIG):
+            if await self.bot.config.remove_admin_role(interaction.guild.id):
 
-            return await interaction.followup.send("⚠️ Admin config file missing.")
+                await interaction.followup.send("✅ All admin roles removed.")
 
-        with open(ADMIN_CONFIG) as f:
+            else:
 
-            data = json.load(f)
+                await interaction.followup.send("ℹ️ No admin role was set for this server.")
 
-        if gid in data:
+        elif await self.bot.config.remove_admin_role(interaction.guild.id, role.id):
 
-            data.pop(gid)
-
-            with open(ADMIN_CONFIG, "w") as f:
-
-                json.dump(data, f, indent=2)
-
-            await interaction.followup.send("✅ Admin role removed.")
+            await interaction.followup.send(f"✅ {role.mention} is no longer an admin role.")
 
         else:
 
-            await interaction.followup.send("ℹ️ No admin role was set for this server.")
+            await interaction.followup.send(f"ℹ️ {role.mention} is not an admin role.")
 
     @is_admin()
 
@@ -148,17 +112,7 @@ class Admin(commands.Cog):
 
         await interaction.response.defer(ephemeral=True)
 
-        gid = str(interaction.guild.id)
-
-        if not os.path.exists(CONFIG_FILE):
-
-            return await interaction.followup.send("⚠️ No channel config file found.")
-
-        with open(CONFIG_FILE) as f:
-
-            data = json.load(f)
-
-        server = data.get(gid)
+        server = self.bot.config.guild_channels(interaction.guild.id)
 
         if not server:
 
@@ -182,9 +136,19 @@ class Admin(commands.Cog):
 
         if cog:
 
-            loops.append("🟢 Meme Loop" if cog.meme_loop.is_running() else "🔴 Meme Loop")
+            state = "🟢" if cog.scheduler.running else "🔴"
+
+            loops.append(f"{state} Scheduler ({len(cog.scheduler)} guild feeds)")
+
+            for feed in ("meme", "quote"):
+
+                due = cog.scheduler.next_in((interaction.guild.id, feed))
 
-            loops.append("🟢 Quote Loop" if cog.quote_loop.is_running() else "🔴 Quote Loop")
+                if due is not None:
+
+                    loops.append(f"   • {feed}: next post in {int(due // 60)}m")
+
+            loops.append("🟢 MangaDex Loop" if cog.mangadex_loop.is_running() else "🔴 MangaDex Loop")
 
         else:
 
@@ -348,6 +312,58 @@ class Admin(commands.Cog):
 
         embed.add_field(name="🔌 Cogs", value=", ".join(cog_list) or "None", inline=False)
 
+        manga = self.bot.get_cog("Manga")
+
+        if manga:
+
+            stats = manga.cache.stats()
+
+            embed.add_field(
+
+                name="🗃️ Jikan Cache",
+
+                value=f"{stats['size']}/{stats['maxsize']} entries • {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%})",
+
+                inline=False
+
+            )
+
+        stats = embed_cache_stats()
+
+        embed.add_field(
+
+            name="🖼️ Embed Cache",
+
+            value=f"{stats['size']}/{stats['maxsize']} embeds • {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%})",
+
+            inline=False
+
+        )
+
+        shard_ids = getattr(self.bot, "shard_ids", None)
+
+        shards = f"shards {', '.join(map(str, shard_ids))} of {self.bot.shard_count}" if shard_ids else f"{self.bot.shard_count or 1} shard(s) in-process"
+
+        leading = ", ".join(sorted(self.bot.coordinator.leading)) or "none"
+
+        embed.add_field(name="🧩 Cluster", value=f"`{self.bot.coordinator.name}` • {shards} • polling: {leading}", inline=False)
+
+        for label, buffer in (("😂 Meme Buffer", self.bot.memes), ("📜 Quote Buffer", self.bot.quotes)):
+
+            stats = buffer.stats()
+
+            latency = f"{stats['refill_p50']:.2f}s p50 / {stats['refill_p95']:.2f}s p95" if stats["refill_p50"] is not None else "no refills yet"
+
+            embed.add_field(
+
+                name=label,
+
+                value=f"{stats['size']}/{stats['maxsize']} ready • {stats['hit_rate']:.0%} served from memory • {stats['fetches']} refills ({latency})",
+
+                inline=False
+
+            )
+
         embed.set_footer(text=f"Python {platform.python_version()} • discord.py {discord.__version__}")
 
         await interaction.followup.send(embed=embed)
@@ -360,7 +376,11 @@ class Admin(commands.Cog):
 
         await interaction.response.defer(ephemeral=True)
 
-        await interaction.followup.send("🛑 Shutting down gracefully...")
+        # Commit write-behind state (feed cursors, last post IDs) before anything is torn down
+
+        flushed = await self.bot.db.flush()
+
+        await interaction.followup.send(f"🛑 Shutting down gracefully... ({flushed} pending state write(s) flushed)")
 
         await self.bot.close()
 
@@ -1,4 +1,6 @@
-import discord, aiohttp, os, json
+import asyncio
+
+from datetime import datetime, timezone
 
 from discord.ext import commands, tasks
 
@@ -6,239 +8,261 @@ from discord import app_commands
 
 from utils.admin_config import is_admin
 
-CONFIG_FILE = os.path.join("config", "autopost_config.json")
+from utils.cache import TTLCache
 
-SCHEDULE_FILE = os.path.join("config", "autopost_schedule.json")
-MANGADEX_LAST_POST_FILE = os.path.join("config", "mangadex_last_post.json")
+from utils.content import History
 
-MEME_URL = "https://meme-api.com/gimme"
+from utils.embeds import render_embed, meme_embed, quote_embed
 
-QUOTE_URL = "https://zenquotes.io/api/random"
+from utils.ratelimit import PRIORITY_BACKGROUND
 
-class Autopost(commands.Cog):
+from utils.scheduler import Scheduler
 
-    def __init__(self, bot):
+from utils.seen import SeenSet
 
-        self.bot = bot
+MANGADEX_API = "https://api.mangadex.org"
 
-        self.intervals = {}  # per guild schedule
+# Per-guild feeds: feed -> (channel config key, default interval in seconds)
+GUILD_FEEDS = {
+    "meme": ("meme_channel", 21600),
+    "quote": ("quote_channel", 21600),
+}
 
-        self.load_intervals()
-        self.last_mangadex_post_id = self.get_last_mangadex_post_id()
+# MangaDex is one shared poll for all guilds, so it keeps a single interval
+MANGADEX_INTERVAL = 1800
 
-        self.meme_loop.change_interval(seconds=self.intervals.get("meme", 21600))
+# How often each process delivers chapters the polling process published
+OUTBOX_DELIVERY_INTERVAL = 60
 
-        self.quote_loop.change_interval(seconds=self.intervals.get("quote", 21600))
-        self.mangadex_loop.change_interval(seconds=self.intervals.get("mangadex", 1800))
+# MangaDex caps ids[] lookups and chapter pages at 100 per request
+MANGADEX_BATCH = 100
+MANGADEX_PAGE_SIZE = 100
 
-        self.meme_loop.start()
+# Upper bound on pages walked per poll (offset + limit must stay under 10k)
+MANGADEX_MAX_PAGES = 20
 
-        self.quote_loop.start()
-        self.mangadex_loop.start()
+# feed_state key holding the publishAt high-water mark
+MANGADEX_CURSOR_KEY = "mangadex_cursor"
 
-    def cog_unload(self):
+class Autopost(commands.Cog):
 
-        self.meme_loop.cancel()
+    def __init__(self, bot):
 
-        self.quote_loop.cancel()
-        self.mangadex_loop.cancel()
+        self.bot = bot
 
-    def load_intervals(self):
+        # One heap-backed timer for every (guild_id, feed) pair
+        self.scheduler = Scheduler(self.run_guild_feed)
+        self.history = {}  # (guild_id, feed) -> History of recently posted items
+        self.outbox_lock = asyncio.Lock()  # one consumer at a time: nothing delivered twice or out of order
+        self.mangadex_seen = SeenSet(bot.db, "mangadex")
+        self.mangadex_meta = TTLCache(maxsize=2048, ttl=6 * 3600)  # manga_id -> (title, cover_url)
 
-        if os.path.exists(SCHEDULE_FILE):
+        self.mangadex_loop.change_interval(seconds=MANGADEX_INTERVAL)
+        self.mangadex_delivery.change_interval(seconds=OUTBOX_DELIVERY_INTERVAL)
 
-            with open(SCHEDULE_FILE) as f:
+    async def cog_load(self):
+        await self.mangadex_seen.load()
+        await self.bot.coordinator.init_cursor("mangadex")
 
-                data = json.load(f)
+        for guild_id in list(self.bot.config.channels):
+            self.sync_guild(guild_id)
+        self.scheduler.start()
+        self.mangadex_loop.start()
+        self.mangadex_delivery.start()
 
-            self.intervals["meme"] = list(data.values())[0].get("meme", 21600)
-            self.intervals["quote"] = list(data.values())[0].get("quote", 21600)
-            self.intervals["mangadex"] = list(data.values())[0].get("mangadex", 1800)
+    def cog_unload(self):
 
+        self.scheduler.stop()
+        self.mangadex_loop.cancel()
+        self.mangadex_delivery.cancel()
 
-        else:
+    def interval(self, guild_id, feed):
+        return self.bot.config.get_schedule(guild_id).get(feed, GUILD_FEEDS[feed][1])
 
-            self.intervals = {"meme": 21600, "quote": 21600, "mangadex": 1800}
+    # (Re)schedule a guild's feeds from its channel and interval settings; other shards' guilds are left to them
+    def sync_guild(self, guild_id):
+        for feed, (key, _) in GUILD_FEEDS.items():
+            if self.get_channel_id(guild_id, key) and self.bot.owns_guild(guild_id):
+                self.scheduler.schedule((guild_id, feed), self.interval(guild_id, feed))
+            else:
+                self.scheduler.unschedule((guild_id, feed))
 
     def get_channel_id(self, guild_id, key):
 
-        if not os.path.exists(CONFIG_FILE):
-
-            return None
-
-        with open(CONFIG_FILE) as f:
-
-            data = json.load(f)
-
-        return data.get(str(guild_id), {}).get(key)
-
-    async def fetch_json(self, url):
-
-        async with aiohttp.ClientSession() as session:
-
-            async with session.get(url) as resp:
-
-                if resp.status == 200:
-
-                    return await resp.json()
-
-        return None
-
-    def get_last_mangadex_post_id(self):
-        if not os.path.exists(MANGADEX_LAST_POST_FILE):
-            return None
-        with open(MANGADEX_LAST_POST_FILE) as f:
-            data = json.load(f)
-            return data.get("last_post_id")
-
-    def set_last_mangadex_post_id(self, post_id):
-        with open(MANGADEX_LAST_POST_FILE, "w") as f:
-            json.dump({"last_post_id": post_id}, f)
-
-    @tasks.loop(seconds=21600)
-
-    async def meme_loop(self):
-
-        await self.bot.wait_until_ready()
+        return self.bot.config.get_channel(guild_id, key)
 
+    # (guild, channel) for every guild that configured a channel for this feed
+    def configured_channels(self, key):
         for guild in self.bot.guilds:
+            cid = self.get_channel_id(guild.id, key)
+            channel = guild.get_channel(cid) if cid else None
+            if channel:
+                yield guild, channel
 
-            cid = self.get_channel_id(guild.id, "meme_channel")
-
-            if not cid:
-
-                continue
-
-            channel = guild.get_channel(cid)
-
-            if not channel:
-
-                continue
-
-            data = await self.fetch_json(MEME_URL)
-
-            if data:
-
-                embed = discord.Embed(
-
-                    title=data.get("title", "Random Meme"),
-
-                    url=data.get("postLink", ""),
-
-                    color=discord.Color.purple()
+    async def fetch_json(self, url):
 
+        return await self.bot.http_client.get_json(url, priority=PRIORITY_BACKGROUND)
+
+    # Title/cover for many MangaDex series in one request per 100 IDs, cached by manga ID;
+    # None if a lookup failed, so callers can retry instead of dropping chapters
+    async def resolve_mangadex_manga(self, manga_ids):
+        found = {}
+        missing = []
+        for manga_id in dict.fromkeys(manga_ids):
+            meta = self.mangadex_meta.get(manga_id)
+            if meta:
+                found[manga_id] = meta
+            else:
+                missing.append(manga_id)
+
+        for i in range(0, len(missing), MANGADEX_BATCH):
+            batch = missing[i:i + MANGADEX_BATCH]
+            ids = "&".join(f"ids[]={manga_id}" for manga_id in batch)
+            data = await self.fetch_json(f"{MANGADEX_API}/manga?limit={len(batch)}&includes[]=cover_art&{ids}")
+            if data is None:
+                return None
+            for manga in data.get("data", []):
+                titles = manga["attributes"]["title"]
+                title = titles.get("en") or next(iter(titles.values()), "Unknown Title")
+                cover_filename = next(
+                    (rel.get("attributes", {}).get("fileName") for rel in manga["relationships"] if rel["type"] == "cover_art"),
+                    None
                 )
-
-                embed.set_image(url=data.get("url"))
-
-                embed.set_footer(text=f"👍 {data.get('ups', 0)} • r/{data.get('subreddit', 'unknown')}")
-
-                await channel.send(embed=embed)
-
-    @tasks.loop(seconds=21600)
-
-    async def quote_loop(self):
-
+                cover_url = f"https://uploads.mangadex.org/covers/{manga['id']}/{cover_filename}" if cover_filename else None
+                found[manga["id"]] = (title, cover_url)
+                self.mangadex_meta.set(manga["id"], (title, cover_url))
+
+                # Title-only entry: lets autocomplete/search know the series exists
+                alt_titles = [t for alt in manga["attributes"].get("altTitles") or [] for t in alt.values()]
+                self.bot.search_index.add(f"mangadex:{manga['id']}", list(titles.values()) + alt_titles)
+        return found
+
+    # Scheduler callback: one feed post to one guild
+    async def run_guild_feed(self, job):
+        guild_id, feed = job
         await self.bot.wait_until_ready()
 
-        for guild in self.bot.guilds:
-
-            cid = self.get_channel_id(guild.id, "quote_channel")
-
-            if not cid:
-
-                continue
-
-            channel = guild.get_channel(cid)
-
-            if not channel:
-
-                continue
-
-            data = await self.fetch_json(QUOTE_URL)
-
-            if data:
+        guild = self.bot.get_guild(guild_id)
+        cid = self.get_channel_id(guild_id, GUILD_FEEDS[feed][0])
+        channel = guild.get_channel(cid) if guild and cid else None
+        if not channel:
+            return
 
-                quote = data[0].get("q", "No quote found.")
+        # Drawn from the shared buffer; the guild's history rules out repeats
+        buffer = self.bot.memes if feed == "meme" else self.bot.quotes
+        item = await buffer.take(self.history.setdefault(job, History()))
+        if item is None:
+            print(f"[Autopost] ⚠️ No fresh {feed} for guild {guild_id}")
+            return
 
-                author = data[0].get("a", "Unknown")
+        embed = meme_embed(item) if feed == "meme" else quote_embed(item)
+        await self.bot.delivery.fan_out([(guild, channel)], lambda channel: channel.send(embed=embed), feed)
 
-                embed = discord.Embed(
+    @tasks.loop(minutes=30)
+    async def mangadex_loop(self):
+        await self.bot.wait_until_ready()
 
-                    description=f'📜 *"{quote}"*\n\n— **{author}**',
+        # Only the lease holder polls; the other processes just deliver what it publishes
+        was_leading = "mangadex" in self.bot.coordinator.leading
+        if not await self.bot.coordinator.acquire("mangadex", ttl=MANGADEX_INTERVAL * 2):
+            return
+        if not was_leading:
+            # Taking over from another process: pick up the chapters it marked as seen
+            await self.mangadex_seen.load()
 
-                    color=discord.Color.gold()
+        await self.poll_mangadex()
+        await self.deliver_mangadex()
 
+    @tasks.loop(seconds=60)
+    async def mangadex_delivery(self):
+        await self.bot.wait_until_ready()
+        await self.deliver_mangadex()
+
+    # Post published chapters to this process's guilds, oldest first
+    async def deliver_mangadex(self):
+        async with self.outbox_lock:
+            for chapter in await self.bot.coordinator.consume("mangadex"):
+                # Built once and shared by every guild's send
+                embed = render_embed("mangadex_chapter", chapter["chapter_id"], **chapter)
+
+                # Post to all configured guilds concurrently
+                await self.bot.delivery.fan_out(
+                    self.configured_channels("mangadex_channel"),
+                    lambda channel: channel.send(embed=embed),
+                    "mangadex"
                 )
 
-                await channel.send(embed=embed)
-
-    @tasks.loop(minutes=30)
-    async def mangadex_loop(self):
-        await self.bot.wait_until_ready()
-        
-        # Fetch the latest chapters
-        url = "https://api.mangadex.org/chapter?limit=20&order[publishAt]=desc&translatedLanguage[]=en"
-        latest_chapters = await self.fetch_json(url)
-        if not latest_chapters or not latest_chapters.get("data"):
+    async def poll_mangadex(self):
+        # First run: start the high-water mark at "now" instead of posting the backlog
+        cursor = await self.bot.db.get_state(MANGADEX_CURSOR_KEY)
+        if not cursor:
+            await self.bot.db.set_state(MANGADEX_CURSOR_KEY, datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"))
             return
 
-        # We process chapters oldest to newest to maintain order
-        for chapter_data in reversed(latest_chapters["data"]):
-            chapter_id = chapter_data["id"]
-            
-            # Avoid posting duplicates
-            if chapter_id == self.last_mangadex_post_id:
+        # Page through everything published since the cursor, oldest first
+        offset = 0
+        for _ in range(MANGADEX_MAX_PAGES):
+            url = (
+                f"{MANGADEX_API}/chapter?limit={MANGADEX_PAGE_SIZE}&offset={offset}"
+                f"&order[publishAt]=asc&translatedLanguage[]=en&includeFuturePublishAt=0&publishAtSince={cursor}"
+            )
+            page = await self.fetch_json(url)
+            if not page or not page.get("data"):
+                break
+
+            handled = await self.publish_mangadex_chapters(page["data"])
+
+            # publishAtSince wants a naive UTC timestamp; overlap at the boundary is caught by mangadex_seen
+            if handled:
+                self.bot.db.set_state_later(MANGADEX_CURSOR_KEY, handled["attributes"]["publishAt"][:19])
+
+            # Series lookup failed part-way: stop here and retry the rest on the next poll
+            if handled is not page["data"][-1]:
+                break
+
+            offset += len(page["data"])
+            if offset >= page.get("total", 0):
+                break
+
+    # Returns the last chapter of the page that was handled (published or skipped for good);
+    # anything after it must be fetched again, so the cursor may only advance that far
+    async def publish_mangadex_chapters(self, chapters):
+        # Unseen chapters, with the series each belongs to
+        new_chapters = []
+        for chapter_data in chapters:
+            if chapter_data["id"] in self.mangadex_seen:
                 continue
-
-            # Fetch manga details
             manga_id = next((rel["id"] for rel in chapter_data["relationships"] if rel["type"] == "manga"), None)
-            if not manga_id:
-                continue
-            
-            manga_details = await self.fetch_json(f"https://api.mangadex.org/manga/{manga_id}")
-            if not manga_details or not manga_details.get("data"):
+            if manga_id:
+                new_chapters.append((chapter_data, manga_id))
+        if not new_chapters:
+            return chapters[-1]
+
+        # Resolve every series on the page in one batched request
+        manga_meta = await self.resolve_mangadex_manga([manga_id for _, manga_id in new_chapters])
+        if manga_meta is None:
+            # Nothing from the first unseen chapter on can be posted yet
+            first = chapters.index(new_chapters[0][0])
+            return chapters[first - 1] if first else None
+
+        # Chapters arrive oldest to newest, which keeps posting order
+        entries = []
+        for chapter_data, manga_id in new_chapters:
+            if manga_id not in manga_meta:
                 continue
-
-            manga_title = manga_details["data"]["attributes"]["title"].get("en", "Unknown Title")
-            
-            # Fetch cover art
-            cover_id = next((rel["id"] for rel in manga_details["data"]["relationships"] if rel["type"] == "cover_art"), None)
-            cover_filename = ""
-            if cover_id:
-                cover_details = await self.fetch_json(f"https://api.mangadex.org/cover/{cover_id}")
-                if cover_details and cover_details.get("data"):
-                    cover_filename = cover_details["data"]["attributes"]["fileName"]
-
-            cover_url = f"https://uploads.mangadex.org/covers/{manga_id}/{cover_filename}" if cover_filename else None
-
-            # Prepare embed
-            chapter_title = chapter_data["attributes"]["title"]
-            chapter_num = chapter_data["attributes"]["chapter"]
-            chapter_url = f"https://mangadex.org/chapter/{chapter_id}"
-            
-            embed = discord.Embed(
-                title=f"New Chapter: {manga_title} - Ch. {chapter_num}",
-                description=f"**Title:** {chapter_title}",
-                url=chapter_url,
-                color=discord.Color.blue()
-            )
-            if cover_url:
-                embed.set_thumbnail(url=cover_url)
-            embed.set_footer(text="Posted from MangaDex")
-            
-            # Post to all configured guilds
-            for guild in self.bot.guilds:
-                cid = self.get_channel_id(guild.id, "mangadex_channel")
-                if not cid:
-                    continue
-                channel = guild.get_channel(cid)
-                if channel:
-                    await channel.send(embed=embed)
-            
-            # Update the last post ID to avoid re-posting
-            self.set_last_mangadex_post_id(chapter_id)
-            self.last_mangadex_post_id = chapter_id
+            manga_title, cover_url = manga_meta[manga_id]
+            entries.append((chapter_data["id"], {
+                "chapter_id": chapter_data["id"],
+                "manga_title": manga_title,
+                "chapter": chapter_data["attributes"]["chapter"],
+                "chapter_title": chapter_data["attributes"]["title"],
+                "cover_url": cover_url,
+            }))
+
+        # Published once for the whole cluster, then remembered so it is never re-posted
+        await self.bot.coordinator.publish("mangadex", entries)
+        await self.mangadex_seen.add_many([chapter_id for chapter_id, _ in entries])
+        return chapters[-1]
 
 async def setup(bot):
 
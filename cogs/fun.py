@@ -1,4 +1,4 @@
-import discord, aiohttp, random
+import discord, random
 
 from discord.ext import commands
 
@@ -10,21 +10,25 @@ class Fun(commands.Cog):
 
         self.bot = bot
 
+    async def cog_load(self):
+
+        # Warm both buffers so the first /meme and /quote answer from memory
+
+        self.bot.memes.schedule_refill()
+
+        self.bot.quotes.schedule_refill()
+
     @app_commands.command(name="meme", description="😂 Send a random meme")
 
     async def meme(self, interaction: discord.Interaction):
 
         await interaction.response.defer()
 
-        async with aiohttp.ClientSession() as session:
+        data = await self.bot.memes.pop()
 
-            async with session.get("https://meme-api.com/gimme") as resp:
+        if not data:
 
-                if resp.status != 200:
-
-                    return await interaction.followup.send("❌ Failed to fetch meme.")
-
-                data = await resp.json()
+            return await interaction.followup.send("❌ Failed to fetch meme.")
 
         await interaction.followup.send(data.get("url", "❌ Meme not found."))
 
@@ -34,19 +38,15 @@ class Fun(commands.Cog):
 
         await interaction.response.defer()
 
-        async with aiohttp.ClientSession() as session:
-
-            async with session.get("https://zenquotes.io/api/random") as resp:
-
-                if resp.status != 200:
+        data = await self.bot.quotes.pop()
 
-                    return await interaction.followup.send("❌ Failed to fetch quote.")
+        if not data:
 
-                data = await resp.json()
+            return await interaction.followup.send("❌ Failed to fetch quote.")
 
-        q = data[0].get("q", "No quote found.")
+        q = data.get("q", "No quote found.")
 
-        a = data[0].get("a", "Unknown")
+        a = data.get("a", "Unknown")
 
         await interaction.followup.send(f'📜 "{q}"\n— *{a}*')
 
@@ -60,7 +60,7 @@ class HelpSelect(discord.ui.Select):
 
             embed.title = "📸 Instagram Tools"
 
-            embed.description = "`/igrefresh`, `/debuginsta`"
+            embed.description = "`/igfollow`, `/igunfollow`, `/igaccounts`, `/igrefresh`, `/debuginsta`"
 
         elif self.values[0] == "manga":
 
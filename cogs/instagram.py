@@ -1,4 +1,8 @@
-import discord, aiohttp, json, os
+import discord, aiohttp, asyncio, re
+
+from collections import deque
+
+from datetime import datetime, timezone
 
 from discord.ext import commands, tasks
 
@@ -6,85 +10,169 @@ from discord import app_commands
 
 from utils.admin_config import is_admin
 
-USERNAME = "xenon.otakus"
+from utils.backoff import Backoff
 
-CONFIG_FILE = os.path.join("config", "autopost_config.json")
+from utils.embeds import render_embed
 
-LAST_POST_FILE = os.path.join("config", "ig_last_post.json")
+from utils.ratelimit import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
 
 DEBUG = True
 
+# Recent failed responses kept in memory for /debuginsta
+
+FAILURE_LOG_SIZE = 10
+
+FAILURE_BODY_LIMIT = 2000
+
+# Instagram usernames: letters, digits, periods and underscores
+
+USERNAME_RE = re.compile(r"^[a-z0-9._]{1,30}$")
+
+MAX_ACCOUNTS_PER_GUILD = 10
+
+def normalize_username(username):
+
+    username = username.strip().lstrip("@").lower()
+
+    return username if USERNAME_RE.match(username) else None
+
+def post_key(post_id):
+
+    # Media IDs grow over time; compare numerically so a deleted post does not stall the feed
+
+    return int(post_id) if str(post_id).isdigit() else 0
+
+class AccountState:
+
+    # Per-account poll state: backoff, conditional-request validators, last good posts
+
+    __slots__ = ("backoff", "etag", "last_modified", "posts", "lock")
+
+    def __init__(self):
+
+        self.backoff = Backoff(base=5 * 60, cap=12 * 3600)
+
+        self.etag = None
+
+        self.last_modified = None
+
+        self.posts = None  # newest first
+
+        self.lock = asyncio.Lock()  # one catch-up per account at a time, so nothing is posted twice
+
 class Instagram(commands.Cog):
 
     def __init__(self, bot):
 
         self.bot = bot
 
+        self.accounts = {}  # username -> AccountState
+
+        self.failures = deque(maxlen=FAILURE_LOG_SIZE)  # (when, username, status, content_type, body)
+
+        self.outbox_lock = asyncio.Lock()  # one consumer at a time: nothing delivered twice or out of order
+
+    async def cog_load(self):
+
+        # Register as an outbox consumer before the first poll can publish anything
+
+        await self.bot.coordinator.init_cursor("instagram")
+
         self.auto_fetch.start()
 
+        self.delivery_loop.start()
+
     def cog_unload(self):
 
         self.auto_fetch.cancel()
 
+        self.delivery_loop.cancel()
+
     def get_channel_id(self, guild_id):
 
-        if not os.path.exists(CONFIG_FILE):
+        return self.bot.config.get_channel(guild_id, "insta_channel")
 
-            return None
+    def account(self, username):
 
-        with open(CONFIG_FILE) as f:
+        return self.accounts.setdefault(username, AccountState())
 
-            data = json.load(f)
+    async def get_last_post_id(self, username):
 
-        return data.get(str(guild_id), {}).get("insta_channel")
+        return await self.bot.db.get_state(f"ig_last_post_id:{username}")
 
-    def get_last_post_id(self):
+    def set_last_post_id(self, username, post_id):
 
-        if not os.path.exists(LAST_POST_FILE):
+        self.bot.db.set_state_later(f"ig_last_post_id:{username}", post_id)
 
-            return None
+    def record_failure(self, username, status, content_type, body):
 
-        with open(LAST_POST_FILE) as f:
+        self.failures.append((datetime.now(timezone.utc), username, status, content_type, body[:FAILURE_BODY_LIMIT]))
 
-            return json.load(f).get("last_post_id")
+    # Recent posts of one account, newest first; concurrent callers share one request
 
-    def set_last_post_id(self, post_id):
+    async def fetch_posts(self, username, priority=PRIORITY_INTERACTIVE):
 
-        with open(LAST_POST_FILE, "w") as f:
+        return await self.bot.http_client.flights.do(("instagram", username), lambda: self._fetch_posts(username, priority))
 
-            json.dump({"last_post_id": post_id}, f)
+    async def _fetch_posts(self, username, priority):
 
-    async def fetch_latest_post(self):
+        state = self.account(username)
 
-        url = f"https://www.instagram.com/{USERNAME}/?__a=1&__d=dis"
+        if not state.backoff.ready:
+
+            print(f"[IG] ⏳ @{username}: backing off, next attempt in {state.backoff.remaining:.0f}s")
+
+            return None
+
+        url = f"https://www.instagram.com/{username}/?__a=1&__d=dis"
 
         headers = {"User-Agent": "Mozilla/5.0"}
 
-        async with aiohttp.ClientSession() as session:
+        # Conditional request: an unchanged profile costs a bodiless 304
+
+        if state.posts is not None:
+
+            if state.etag:
+
+                headers["If-None-Match"] = state.etag
+
+            if state.last_modified:
+
+                headers["If-Modified-Since"] = state.last_modified
 
-            async with session.get(url, headers=headers) as resp:
+        try:
+
+            async with self.bot.http_client.get(url, priority, headers=headers) as resp:
 
                 content_type = resp.headers.get("Content-Type", "")
 
                 if DEBUG:
 
-                    print(f"[IG] Status: {resp.status} | Content-Type: {content_type}")
+                    print(f"[IG] @{username} Status: {resp.status} | Content-Type: {content_type}")
+
+                if resp.status == 304:
+
+                    state.backoff.success()
 
-                if resp.status == 201 or "text/html" in content_type:
+                    return state.posts
 
-                    html = await resp.text()
+                if resp.status in (201, 429) or "text/html" in content_type:
 
-                    with open("ig_debug.html", "w", encoding="utf-8") as f:
+                    self.record_failure(username, resp.status, content_type, await resp.text())
 
-                        f.write(html)
+                    delay = state.backoff.failure(minimum=self.bot.http_client.limiter.bucket(url).blocked_for)
 
-                    print("[IG] 🚨 Received HTML instead of JSON. Dumped to ig_debug.html.")
+                    print(f"[IG] 🚨 @{username}: rate limited or challenged ({resp.status}); backing off {delay:.0f}s.")
 
                     return None
 
                 if resp.status != 200:
 
-                    print("[IG] ❌ Instagram returned non-200 status.")
+                    self.record_failure(username, resp.status, content_type, await resp.text())
+
+                    delay = state.backoff.failure()
+
+                    print(f"[IG] ❌ @{username}: Instagram returned {resp.status}; backing off {delay:.0f}s.")
 
                     return None
 
@@ -94,27 +182,41 @@ class Instagram(commands.Cog):
 
                     edges = data["graphql"]["user"]["edge_owner_to_timeline_media"]["edges"]
 
-                    return edges[0]["node"] if edges else None
+                    posts = [edge["node"] for edge in edges]
 
                 except Exception as e:
 
-                    print(f"[IG] 💥 Failed to parse Instagram JSON: {e}")
+                    print(f"[IG] 💥 @{username}: failed to parse Instagram JSON: {e}")
 
                     return None
 
-    async def send_post(self, guild, post):
+                state.backoff.success()
 
-        cid = self.get_channel_id(guild.id)
+                state.etag = resp.headers.get("ETag")
 
-        if not cid:
+                state.last_modified = resp.headers.get("Last-Modified")
 
-            return
+                state.posts = posts
 
-        channel = guild.get_channel(cid)
+                return posts
 
-        if not channel:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
 
-            return
+            self.record_failure(username, None, "", f"{type(e).__name__}: {e}")
+
+            delay = state.backoff.failure()
+
+            print(f"[IG] ⚠️ @{username}: {type(e).__name__} while polling; backing off {delay:.0f}s.")
+
+            return None
+
+    def get_post_channel(self, guild):
+
+        cid = self.get_channel_id(guild.id)
+
+        return guild.get_channel(cid) if cid else None
+
+    async def send_post(self, channel, username, post):
 
         caption_data = post.get("edge_media_to_caption", {}).get("edges", [])
 
@@ -130,21 +232,19 @@ class Instagram(commands.Cog):
 
             media_urls = [post.get("display_url")]
 
-        embed = discord.Embed(
+        embed = render_embed(
 
-            title=f"📸 New Post from @{USERNAME}",
+            "instagram", post["id"],
 
-            description=caption[:1024],
+            username=username,
 
-            color=discord.Color.orange(),
+            caption=caption[:1024],
 
-            url=f"https://www.instagram.com/p/{post['shortcode']}/"
+            shortcode=post["shortcode"],
 
-        )
-
-        embed.set_image(url=media_urls[0])
+            image_url=media_urls[0]
 
-        embed.set_footer(text="Instagram Auto-Post")
+        )
 
         await channel.send(embed=embed)
 
@@ -152,67 +252,288 @@ class Instagram(commands.Cog):
 
             await channel.send(extra)
 
-    @tasks.loop(hours=12)
+    # Fetch one account once and publish every unseen post, oldest first, for the whole cluster
+
+    async def poll_account(self, username, priority=PRIORITY_BACKGROUND):
+
+        async with self.account(username).lock:
+
+            return await self._poll_account(username, priority)
+
+    async def _poll_account(self, username, priority):
+
+        posts = await self.fetch_posts(username, priority)
+
+        if not posts:
+
+            return 0
+
+        last = await self.get_last_post_id(username)
+
+        if last is None or not post_key(last):
+
+            # First poll of a new account (or a placeholder legacy ID): start from its latest post instead of replaying history
+
+            unseen = posts[:1]
+
+        else:
+
+            unseen = [post for post in posts if post_key(post["id"]) > post_key(last)]
+
+        if not unseen:
+
+            return 0
+
+        unseen.sort(key=lambda p: post_key(p["id"]))
+
+        # The outbox ignores IDs it already holds, so a poll repeated after a takeover cannot double-post
+
+        await self.bot.coordinator.publish(
+
+            "instagram",
+
+            [(f"{username}:{post['id']}", {"username": username, "post": post}) for post in unseen]
+
+        )
+
+        self.set_last_post_id(username, unseen[-1]["id"])
+
+        return len(unseen)
+
+    # Deliver published posts to the guilds of this process that follow each account
+
+    async def deliver_posts(self):
+
+        async with self.outbox_lock:
+
+            entries = await self.bot.coordinator.consume("instagram")
+
+            followers = self.bot.config.ig_followers()
+
+            for entry in entries:
+
+                username, post = entry["username"], entry["post"]
+
+                targets = []
+
+                for gid in followers.get(username, []):
+
+                    guild = self.bot.get_guild(gid)
+
+                    channel = self.get_post_channel(guild) if guild else None
+
+                    if channel:
+
+                        targets.append((guild, channel))
+
+                await self.bot.delivery.fan_out(
+
+                    targets,
+
+                    lambda channel, post=post: self.send_post(channel, username, post),
+
+                    f"instagram @{username}"
+
+                )
+
+            return len(entries)
+
+    @tasks.loop(minutes=30)
 
     async def auto_fetch(self):
 
         await self.bot.wait_until_ready()
 
-        post = await self.fetch_latest_post()
+        # One process per cluster polls, and one fetch per distinct account however many guilds follow it
 
-        if not post:
+        if not await self.bot.coordinator.acquire("instagram", ttl=2 * 3600):
 
             return
 
-        last = self.get_last_post_id()
+        accounts = await self.bot.config.all_ig_accounts()
 
-        if post["id"] == last:
+        await asyncio.gather(*(self.poll_account(username) for username in accounts))
 
-            return
+        await self.deliver_posts()
+
+    @tasks.loop(seconds=60)
+
+    async def delivery_loop(self):
+
+        await self.bot.wait_until_ready()
+
+        await self.deliver_posts()
+
+    @is_admin()
+
+    @app_commands.command(name="igfollow", description="➕ Follow an Instagram account in this server")
+
+    async def igfollow(self, interaction: discord.Interaction, username: str):
+
+        await interaction.response.defer(ephemeral=True)
+
+        name = normalize_username(username)
+
+        if not name:
+
+            return await interaction.followup.send("❌ That is not a valid Instagram username.")
+
+        if len(self.bot.config.get_ig_accounts(interaction.guild.id)) >= MAX_ACCOUNTS_PER_GUILD:
+
+            return await interaction.followup.send(f"❌ This server already follows {MAX_ACCOUNTS_PER_GUILD} accounts.")
+
+        if not await self.bot.config.add_ig_account(interaction.guild.id, name):
+
+            return await interaction.followup.send(f"ℹ️ Already following **@{name}**.")
+
+        msg = f"✅ Now following **@{name}**."
+
+        if not self.get_post_channel(interaction.guild):
+
+            msg += "\n⚠️ No Instagram channel configured yet. Use `/setchannel insta`."
+
+        await interaction.followup.send(msg)
+
+    @is_admin()
+
+    @app_commands.command(name="igunfollow", description="➖ Stop following an Instagram account in this server")
+
+    async def igunfollow(self, interaction: discord.Interaction, username: str):
+
+        await interaction.response.defer(ephemeral=True)
+
+        name = normalize_username(username) or username
+
+        if await self.bot.config.remove_ig_account(interaction.guild.id, name):
+
+            await interaction.followup.send(f"✅ Unfollowed **@{name}**.")
 
-        self.set_last_post_id(post["id"])
+        else:
+
+            await interaction.followup.send(f"ℹ️ This server does not follow **@{name}**.")
+
+    @igunfollow.autocomplete("username")
+
+    async def igunfollow_autocomplete(self, interaction: discord.Interaction, current: str):
+
+        if interaction.guild_id is None:
+
+            return []
 
-        for guild in self.bot.guilds:
+        current = current.lower().lstrip("@")
 
-            await self.send_post(guild, post)
+        return [
+
+            app_commands.Choice(name=f"@{name}", value=name)
+
+            for name in self.bot.config.get_ig_accounts(interaction.guild_id)
+
+            if current in name
+
+        ][:25]
 
     @is_admin()
 
-    @app_commands.command(name="igrefresh", description="🔄 Fetch and post the latest Instagram update")
+    @app_commands.command(name="igaccounts", description="📋 List Instagram accounts followed in this server")
+
+    async def igaccounts(self, interaction: discord.Interaction):
+
+        await interaction.response.defer(ephemeral=True)
+
+        accounts = self.bot.config.get_ig_accounts(interaction.guild.id)
+
+        if not accounts:
+
+            return await interaction.followup.send("ℹ️ This server does not follow any Instagram accounts. Use `/igfollow`.")
+
+        await interaction.followup.send("\n".join(f"• **@{name}**" for name in accounts))
+
+    @is_admin()
+
+    @app_commands.command(name="igrefresh", description="🔄 Check followed Instagram accounts for new posts now")
 
     async def igrefresh(self, interaction: discord.Interaction):
 
         await interaction.response.defer(ephemeral=True)
 
-        post = await self.fetch_latest_post()
+        if not self.get_post_channel(interaction.guild):
+
+            return await interaction.followup.send("⚠️ No Instagram channel configured. Use `/setchannel insta`.")
+
+        accounts = self.bot.config.get_ig_accounts(interaction.guild.id)
+
+        if not accounts:
 
-        if not post:
+            return await interaction.followup.send("ℹ️ This server does not follow any Instagram accounts. Use `/igfollow`.")
 
-            return await interaction.followup.send("❌ No valid Instagram post found.")
+        # Only the process holding the lease polls; posts go out through the outbox to every follower,
+        # not just this server, so the shared last-post IDs stay consistent
 
-        if post["id"] == self.get_last_post_id():
+        if not await self.bot.coordinator.acquire("instagram", ttl=2 * 3600):
 
-            return await interaction.followup.send("ℹ️ Already posted. No new content.")
+            await self.deliver_posts()
 
-        self.set_last_post_id(post["id"])
+            return await interaction.followup.send("ℹ️ Instagram is polled by another bot process; new posts reach this server within a minute.")
 
-        await self.send_post(interaction.guild, post)
+        counts = await asyncio.gather(*(self.poll_account(name, PRIORITY_INTERACTIVE) for name in accounts))
 
-        await interaction.followup.send("✅ Latest Instagram content posted.")
+        await self.deliver_posts()
+
+        total = sum(counts)
+
+        if not total:
+
+            return await interaction.followup.send("ℹ️ No new content.")
+
+        await interaction.followup.send(f"✅ Posted {total} new Instagram post(s).")
 
     @is_admin()
 
     @app_commands.command(name="debuginsta", description="🛠️ Debug info for latest Instagram post")
 
-    async def debuginsta(self, interaction: discord.Interaction):
+    async def debuginsta(self, interaction: discord.Interaction, username: str = None):
 
         await interaction.response.defer(ephemeral=True)
 
-        post = await self.fetch_latest_post()
+        if username is None:
+
+            accounts = self.bot.config.get_ig_accounts(interaction.guild.id)
+
+            if not accounts:
+
+                return await interaction.followup.send("ℹ️ This server does not follow any Instagram accounts. Use `/igfollow`.")
+
+            username = accounts[0]
+
+        name = normalize_username(username)
+
+        if not name:
+
+            return await interaction.followup.send("❌ That is not a valid Instagram username.")
+
+        posts = await self.fetch_posts(name)
 
-        if not post:
+        if not posts:
 
-            return await interaction.followup.send("❌ Failed to retrieve post data.")
+            msg = "❌ Failed to retrieve post data."
+
+            state = self.account(name)
+
+            if not state.backoff.ready:
+
+                msg += f"\n⏳ Backing off for {state.backoff.remaining:.0f}s after {state.backoff.failures} failure(s)."
+
+            failures = [f for f in self.failures if f[1] == name]
+
+            if failures:
+
+                when, _, status, content_type, body = failures[-1]
+
+                msg += f"\n🧾 Last failure {when:%H:%M:%S} UTC • `{status}` `{content_type}`\n```{body[:300]}```"
+
+            return await interaction.followup.send(msg)
+
+        post = posts[0]
 
         cap = post.get("edge_media_to_caption", {}).get("edges", [])
 
@@ -220,12 +541,16 @@ class Instagram(commands.Cog):
 
         count = len(post.get("edge_sidecar_to_children", {}).get("edges", [])) or 1
 
+        last = await self.get_last_post_id(name)
+
         await interaction.followup.send(
 
-            f"🧪 Debug Info:\n• ID: `{post['id']}`\n• Media: {count} item(s)\n• Shortcode: `{post['shortcode']}`\n• Caption: {cap_text[:150]}..."
+            f"🧪 Debug Info (@{name}):\n• ID: `{post['id']}`\n• Last posted ID: `{last}`\n• Recent posts: {len(posts)}"
+
+            f"\n• Media: {count} item(s)\n• Shortcode: `{post['shortcode']}`\n• Caption: {cap_text[:150]}..."
 
         )
 
 async def setup(bot):
 
-    await bot.add_cog(Instagram(bot))
\ No newline at end of file
+    await bot.add_cog(Instagram(bot))
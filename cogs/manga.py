@@ -1,46 +1,194 @@
-import discord, aiohttp, random
+import discord
 
 from discord.ext import commands
 
 from discord import app_commands
 
+from urllib.parse import urlsplit
+
 from utils.admin_config import is_admin
 
+from utils.cache import TTLCache
+
+from utils.http import normalize_url
+
+from utils.search import normalize_title
+
+from utils.manga_pool import MangaPool
+
+from utils.ratelimit import PRIORITY_BACKGROUND
+
+from utils.records import MangaRecord, CharacterRecord
+
+from utils.embeds import render_embed
+
+# Seconds a Jikan response stays fresh, by endpoint path (first match wins)
+
+JIKAN_TTLS = [
+
+    ("/v4/top/manga", 3600),
+
+    ("/v4/manga", 1800),
+
+]
+
+JIKAN_DEFAULT_TTL = 600
+
+# Only an exact normalized title answers /manga without calling Jikan; a prefix match
+# ("one piece" -> "One Piece Party") can score high but still be the wrong series
+
+LOCAL_MATCH_SCORE = 1.0
+
+# Weakest local match offered when Jikan finds nothing (typo rescue)
+
+FUZZY_FALLBACK_SCORE = 0.4
+
+# Discord shows at most 25 choices of up to 100 characters
+
+MAX_CHOICES = 25
+
+CHARACTERS_PER_PAGE = 5
+
+def jikan_titles(manga):
+
+    titles = [manga.get("title"), manga.get("title_english"), manga.get("title_japanese")]
+
+    titles += manga.get("title_synonyms") or []
+
+    titles += [t.get("title") for t in manga.get("titles") or []]
+
+    return [t for t in titles if t]
+
+def jikan_ttl(key):
+
+    path = urlsplit(key).path
+
+    for prefix, ttl in JIKAN_TTLS:
+
+        if prefix in path:
+
+            return ttl
+
+    return JIKAN_DEFAULT_TTL
+
 class Manga(commands.Cog):
 
     def __init__(self, bot):
 
         self.bot = bot
 
-    # Helper to query Jikan
+        self.cache = TTLCache(maxsize=512, ttl=JIKAN_DEFAULT_TTL)
+
+        self.pool = MangaPool(
+
+            lambda url: bot.http_client.get_json(url, priority=PRIORITY_BACKGROUND),
+
+            parse=self.index_manga
+
+        )
 
-    async def jikan_request(self, url):
+        # Memoized autocomplete answers per (field, typed prefix); bounded so many typers stay cheap
 
-        async with aiohttp.ClientSession() as session:
+        self.suggestions = TTLCache(maxsize=512, ttl=120)
 
-            async with session.get(url) as resp:
+        # mal_id -> [CharacterRecord, ...]
 
-                if resp.status == 200:
+        self.characters = TTLCache(maxsize=256, ttl=6 * 3600)
 
-                    return await resp.json()
+    async def cog_load(self):
 
-        return None
+        # Warm the random pool in the background; commands wait for it only if it is still empty
+
+        self.pool.schedule_refresh()
+
+        self.bot.add_dynamic_items(RandomButton)
+
+    def cog_unload(self):
+
+        self.pool.cancel()
+
+        self.bot.remove_dynamic_items(RandomButton)
+
+    # Helper to query Jikan (served from cache while fresh).
+    # With parse, the parsed result is what gets cached instead of the raw JSON.
+
+    async def jikan_request(self, url, parse=None):
+
+        key = normalize_url(url)
+
+        data = self.cache.get(key)
+
+        if data is not None:
+
+            return data
+
+        data = await self.bot.http_client.get_json(url)
+
+        if data is None:
+
+            return None
+
+        if parse:
+
+            data = parse(data)
+
+        self.cache.set(key, data, ttl=jikan_ttl(key))
+
+        return data
+
+    # Slim record for one Jikan entry; its titles also go into the local search index
+
+    def index_manga(self, manga):
+
+        record = MangaRecord.from_jikan(manga)
+
+        self.bot.search_index.add(record.mal_id, jikan_titles(manga), record)
+
+        return record
+
+    def parse_manga_list(self, data):
+
+        return [self.index_manga(m) for m in data.get("data") or [] if "mal_id" in m]
+
+    # Character list for a manga, fetched once and kept in compact form
+
+    async def fetch_characters(self, mal_id):
+
+        characters = self.characters.get(mal_id)
+
+        if characters is not None:
+
+            return characters
+
+        data = await self.bot.http_client.get_json(f"https://api.jikan.moe/v4/manga/{mal_id}/characters")
+
+        if not data or data.get("data") is None:
+
+            return None
+
+        characters = [CharacterRecord.from_jikan(entry) for entry in data["data"]]
+
+        self.characters.set(mal_id, characters)
+
+        return characters
 
     # Core embed builder
 
     def build_embed(self, manga):
 
-        return discord.Embed(
+        return render_embed(
 
-            title=manga.get("title", "Unknown Title"),
+            "manga", manga.mal_id,
 
-            description=(manga.get("synopsis")[:300] or "No synopsis.") + "...",
+            title=manga.title,
 
-            url=manga.get("url"),
+            synopsis=(manga.synopsis[:300] or "No synopsis.") + "...",
 
-            color=discord.Color.teal()
+            url=manga.url,
 
-        ).set_image(url=manga.get("images", {}).get("jpg", {}).get("image_url", ""))
+            image_url=manga.image_url
+
+        )
 
     # ——— COMMAND: /manga ———
 
@@ -50,20 +198,64 @@ class Manga(commands.Cog):
 
         await interaction.response.defer()
 
-        data = await self.jikan_request(f"https://api.jikan.moe/v4/manga?q={query}&limit=1")
+        manga = await self.search_manga(query)
 
-        if not data or not data.get("data"):
+        if not manga:
 
             return await interaction.followup.send("❌ No manga found.")
 
-        manga = data["data"][0]
-
         embed = self.build_embed(manga)
 
-        view = MangaDropdownView(manga["mal_id"], manga)
+        view = MangaDropdownView(manga)
 
         await interaction.followup.send(embed=embed, view=view)
 
+    # Local index first, then Jikan, then the closest local fuzzy match
+
+    async def search_manga(self, query):
+
+        # Title-only hits (e.g. from MangaDex) carry no payload and cannot answer on their own
+
+        hits = [h for h in self.bot.search_index.search(query, limit=5, min_score=FUZZY_FALLBACK_SCORE) if h[3]]
+
+        if hits and hits[0][0] >= LOCAL_MATCH_SCORE:
+
+            return hits[0][3]
+
+        results = await self.jikan_request(f"https://api.jikan.moe/v4/manga?q={query}&limit=1", parse=self.parse_manga_list)
+
+        if results:
+
+            return results[0]
+
+        return hits[0][3] if hits else None
+
+    @manga.autocomplete("query")
+
+    async def manga_query_autocomplete(self, interaction: discord.Interaction, current: str):
+
+        key = ("query", normalize_title(current))
+
+        choices = self.suggestions.get(key)
+
+        if choices is None:
+
+            if key[1]:
+
+                titles = [title for _, _, title, _ in self.bot.search_index.search(current, limit=MAX_CHOICES)]
+
+            else:
+
+                titles = [m.title for m in self.pool.items[:MAX_CHOICES]]
+
+            choices = [app_commands.Choice(name=t[:100], value=t[:100]) for t in titles]
+
+            if choices:
+
+                self.suggestions.set(key, choices)
+
+        return choices
+
     # ——— COMMAND: /randommanga ———
 
     @app_commands.command(name="randommanga", description="🎲 Surprise manga pick")
@@ -82,49 +274,55 @@ class Manga(commands.Cog):
 
         embed = self.build_embed(manga)
 
-        view = RandomNextButton(self.fetch_random_manga, genre)
+        view = random_view(genre)
 
         await interaction.followup.send(embed=embed, view=view)
 
-    async def fetch_random_manga(self, genre=None):
+    @randommanga.autocomplete("genre")
 
-        # Fallback to seasonal/top if genre fails
+    async def randommanga_genre_autocomplete(self, interaction: discord.Interaction, current: str):
 
-        url = "https://api.jikan.moe/v4/top/manga?limit=25&type=manga"
+        key = ("genre", current.strip().lower())
 
-        data = await self.jikan_request(url)
+        choices = self.suggestions.get(key)
 
-        if not data or not data.get("data"):
+        if choices is None:
 
-            return None
+            genres = self.pool.genres()
+
+            matches = [g for g in genres if g.startswith(key[1])] + [g for g in genres if key[1] in g and not g.startswith(key[1])]
+
+            choices = [app_commands.Choice(name=g.title(), value=g) for g in matches[:MAX_CHOICES]]
+
+            if choices:
+
+                self.suggestions.set(key, choices)
 
-        pool = data["data"]
+        return choices
 
-        if genre:
+    async def fetch_random_manga(self, genre=None):
 
-            genre = genre.lower()
+        # Served from the prefetched pool; only the very first call waits on Jikan
 
-            pool = [m for m in pool if genre in [g["name"].lower() for g in m.get("genres", [])]]
+        await self.pool.ensure_loaded()
 
-        return random.choice(pool) if pool else None
+        return self.pool.pick(genre)
 
 # ——— INTERACTIVE: Dropdown Menu for /manga ———
 
 class MangaDropdownView(discord.ui.View):
 
-    def __init__(self, mal_id, manga):
+    def __init__(self, manga):
 
         super().__init__(timeout=60)
 
-        self.add_item(MangaDropdown(mal_id, manga))
+        self.add_item(MangaDropdown(manga))
 
 class MangaDropdown(discord.ui.Select):
 
-    def __init__(self, mal_id, manga):
-
-        self.mal_id = mal_id
+    def __init__(self, manga):
 
-        self.manga = manga
+        self.manga = manga  # MangaRecord
 
         options = [
 
@@ -142,7 +340,7 @@ class MangaDropdown(discord.ui.Select):
 
         if self.values[0] == "synopsis":
 
-            text = self.manga.get("synopsis", "No synopsis found.")
+            text = self.manga.synopsis or "No synopsis found."
 
             embed = discord.Embed(title="📖 Full Synopsis", description=text[:4000], color=discord.Color.dark_teal())
 
@@ -150,117 +348,155 @@ class MangaDropdown(discord.ui.Select):
 
         elif self.values[0] == "characters":
 
-            data = await self.fetch_characters()
+            cog = interaction.client.get_cog("Manga")
+
+            data = await cog.fetch_characters(self.manga.mal_id) if cog else None
 
             if not data:
 
                 return await interaction.response.send_message("❌ No characters found.", ephemeral=True)
 
-            top_chars = data[:5]
-
-            view = CharacterSelectView(top_chars)
+            view = CharacterSelectView(data)
 
             await interaction.response.edit_message(content="👥 Choose a character to explore:", view=view, embed=None)
 
         elif self.values[0] == "link":
 
-            await interaction.response.send_message(self.manga["url"], ephemeral=True)
+            await interaction.response.send_message(self.manga.url, ephemeral=True)
 
-    async def fetch_characters(self):
+# ——— INTERACTIVE: Character Drilldown Buttons ———
 
-        url = f"https://api.jikan.moe/v4/manga/{self.mal_id}/characters"
+class CharacterSelectView(discord.ui.View):
 
-        async with aiohttp.ClientSession() as session:
+    def __init__(self, characters, page=0):
 
-            async with session.get(url) as resp:
+        super().__init__(timeout=90)
 
-                if resp.status != 200:
+        self.characters = characters  # shared with the cog's cache, never copied
 
-                    return None
+        self.page = page
 
-                data = await resp.json()
+        self.render()
 
-                return data.get("data")
+    @property
 
-# ——— INTERACTIVE: Character Drilldown Buttons ———
+    def pages(self):
 
-class CharacterSelectView(discord.ui.View):
+        return max(1, -(-len(self.characters) // CHARACTERS_PER_PAGE))
 
-    def __init__(self, characters):
+    def render(self):
 
-        super().__init__(timeout=90)
+        self.clear_items()
 
-        for char in characters:
+        start = self.page * CHARACTERS_PER_PAGE
 
-            name = char["character"]["name"]
+        for char in self.characters[start:start + CHARACTERS_PER_PAGE]:
 
-            self.add_item(CharacterButton(label=name[:25], char=char))
+            self.add_item(CharacterButton(label=char.name[:25], char=char))
 
-class CharacterButton(discord.ui.Button):
+        if self.pages > 1:
 
-    def __init__(self, label, char):
+            self.add_item(CharacterPageButton("◀️", -1, disabled=self.page == 0))
+
+            self.add_item(CharacterPageButton(f"{self.page + 1}/{self.pages}", 0, disabled=True))
+
+            self.add_item(CharacterPageButton("▶️", 1, disabled=self.page >= self.pages - 1))
 
-        super().__init__(label=label, style=discord.ButtonStyle.secondary)
+class CharacterPageButton(discord.ui.Button):
 
-        self.char = char
+    def __init__(self, label, step, disabled=False):
+
+        super().__init__(label=label, style=discord.ButtonStyle.primary, disabled=disabled, row=1)
+
+        self.step = step
 
     async def callback(self, interaction: discord.Interaction):
 
-        char = self.char["character"]
+        view = self.view
 
-        role = self.char.get("role", "Unknown")
+        view.page = min(max(view.page + self.step, 0), view.pages - 1)
 
-        va = self.char.get("voice_actors", [{}])[0].get("name", "—")
+        view.render()
+
+        await interaction.response.edit_message(view=view)
+
+class CharacterButton(discord.ui.Button):
+
+    def __init__(self, label, char):
+
+        super().__init__(label=label, style=discord.ButtonStyle.secondary, row=0)
+
+        self.char = char  # CharacterRecord
+
+    async def callback(self, interaction: discord.Interaction):
+
+        char = self.char
 
         embed = discord.Embed(
 
-            title=char["name"],
+            title=char.name,
 
-            description=f"**Role:** {role}\n**Voice Actor:** {va}",
+            description=f"**Role:** {char.role}\n**Voice Actor:** {char.voice_actor}",
 
             color=discord.Color.blue()
 
-        ).set_image(url=char.get("images", {}).get("jpg", {}).get("image_url", ""))
+        ).set_image(url=char.image_url)
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # ——— INTERACTIVE: ⏭️ Button for /randommanga ———
 
-class RandomNextButton(discord.ui.View):
+# Stateless and registered once in cog_load: the genre lives in the custom_id,
 
-    def __init__(self, fetch_func, genre):
+# so no per-message object is kept and old buttons still work after a restart
 
-        super().__init__(timeout=60)
+class RandomButton(discord.ui.DynamicItem[discord.ui.Button], template=r"manga:random:(?P<genre>[^:]*)"):
 
-        self.fetch_func = fetch_func
+    def __init__(self, genre=None):
 
-        self.genre = genre
+        # ":" would break the custom_id template match, leaving a button nothing routes to
 
-        self.add_item(RandomButton(fetch_func, genre))
+        self.genre = " ".join((genre or "").replace(":", " ").lower().split())[:80]
 
-class RandomButton(discord.ui.Button):
+        super().__init__(
 
-    def __init__(self, fetch_func, genre):
+            discord.ui.Button(
 
-        super().__init__(label="⏭️ Next Manga", style=discord.ButtonStyle.primary)
+                label="⏭️ Next Manga",
 
-        self.fetch_func = fetch_func
+                style=discord.ButtonStyle.primary,
 
-        self.genre = genre
+                custom_id=f"manga:random:{self.genre}"
+
+            )
+
+        )
+
+    @classmethod
+
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+
+        return cls(match["genre"])
 
     async def callback(self, interaction: discord.Interaction):
 
-        manga = await self.fetch_func(self.genre)
+        cog = interaction.client.get_cog("Manga")
+
+        manga = await cog.fetch_random_manga(self.genre or None) if cog else None
 
         if not manga:
 
             return await interaction.response.send_message("❌ No new manga found.", ephemeral=True)
 
-        embed = Manga(None).build_embed(manga)
+        await interaction.response.edit_message(embed=cog.build_embed(manga))
+
+def random_view(genre):
+
+    view = discord.ui.View(timeout=None)
 
-        view = RandomNextButton(self.fetch_func, self.genre)
+    view.add_item(RandomButton(genre))
 
-        await interaction.response.edit_message(embed=embed, view=view)
+    return view
 
 async def setup(bot):
 
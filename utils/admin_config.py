@@ -1,29 +1,25 @@
-import os, json
-
 from discord import app_commands
 
-ADMIN_CONFIG = os.path.join("config", "admin_roles.json")
-
 def is_admin():
 
     async def predicate(interaction):
 
-        gid = str(interaction.guild.id)
+        if interaction.guild is None:
 
-        if not os.path.exists(ADMIN_CONFIG):
+            raise app_commands.NoPrivateMessage()
 
-            return False
+        # In-memory frozenset kept current by /setadminrole and /removeadminrole; no disk access
 
-        with open(ADMIN_CONFIG, "r") as f:
+        admin_roles = interaction.client.config.get_admin_roles(interaction.guild.id)
 
-            data = json.load(f)
+        if not admin_roles:
 
-        rid = data.get(gid)
+            return False
 
-        if not rid:
+        # Member.get_role is a binary search on the member's sorted role IDs, so this stays
 
-            return False
+        # cheap however many roles the member has; admin_roles is usually one or two IDs
 
-        return any(role.id == rid for role in interaction.user.roles)
+        return any(interaction.user.get_role(rid) for rid in admin_roles)
 
     return app_commands.check(predicate)
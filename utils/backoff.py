@@ -0,0 +1,36 @@
+import random, time
+
+# Exponential backoff with jitter for upstreams that block or challenge us.
+# Each consecutive failure doubles the wait (up to cap); the actual delay is
+# randomized around it so retries from several pollers do not line up.
+
+
+class Backoff:
+
+    def __init__(self, base=60, cap=6 * 3600, jitter=0.5):
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def ready(self):
+        return time.monotonic() >= self.retry_at
+
+    @property
+    def remaining(self):
+        return max(0.0, self.retry_at - time.monotonic())
+
+    # Record a failure; returns the chosen delay in seconds
+    def failure(self, minimum=0):
+        delay = min(self.cap, self.base * 2 ** self.failures)
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        delay = max(delay, minimum)
+        self.failures += 1
+        self.retry_at = time.monotonic() + delay
+        return delay
+
+    def success(self):
+        self.failures = 0
+        self.retry_at = 0.0
@@ -0,0 +1,128 @@
+# In-memory view of the bot's configuration, backed by SQLite (utils/database.py).
+# Everything is loaded once in setup_hook (bot.config); reads are plain dict
+# lookups and writes update the dict and the matching row.
+
+
+class ConfigStore:
+
+    def __init__(self, db):
+        self.db = db
+        self.channels = {}      # guild_id -> {kind: channel_id}
+        self.admin_roles = {}   # guild_id -> frozenset of role_ids
+        self.schedules = {}     # guild_id -> {feed: seconds}
+        self.ig_accounts = {}   # guild_id -> {username, ...}
+
+    async def load(self):
+        for gid, kind, cid in await self.db.fetchall("SELECT guild_id, kind, channel_id FROM guild_channels"):
+            self.channels.setdefault(gid, {})[kind] = cid
+        roles = {}
+        for gid, rid in await self.db.fetchall("SELECT guild_id, role_id FROM admin_roles"):
+            roles.setdefault(gid, set()).add(rid)
+        self.admin_roles = {gid: frozenset(rids) for gid, rids in roles.items()}
+        for gid, feed, seconds in await self.db.fetchall("SELECT guild_id, feed, interval FROM schedules"):
+            self.schedules.setdefault(gid, {})[feed] = seconds
+        for gid, username in await self.db.fetchall("SELECT guild_id, username FROM ig_subscriptions"):
+            self.ig_accounts.setdefault(gid, set()).add(username)
+        return self
+
+    # ——— Autopost channels ———
+
+    def get_channel(self, guild_id, key):
+        return self.channels.get(int(guild_id), {}).get(key)
+
+    def guild_channels(self, guild_id):
+        return dict(self.channels.get(int(guild_id), {}))
+
+    async def set_channel(self, guild_id, key, channel_id):
+        self.channels.setdefault(int(guild_id), {})[key] = channel_id
+        await self.db.execute(
+            "INSERT OR REPLACE INTO guild_channels (guild_id, kind, channel_id) VALUES (?, ?, ?)",
+            (int(guild_id), key, channel_id)
+        )
+
+    # ——— Admin roles ———
+
+    # Sets are replaced, never mutated, so a reader never sees a half-applied change
+
+    def get_admin_roles(self, guild_id):
+        return self.admin_roles.get(int(guild_id), frozenset())
+
+    async def add_admin_role(self, guild_id, role_id):
+        roles = self.get_admin_roles(guild_id)
+        if role_id in roles:
+            return False
+        self.admin_roles[int(guild_id)] = roles | {role_id}
+        await self.db.execute(
+            "INSERT OR IGNORE INTO admin_roles (guild_id, role_id) VALUES (?, ?)",
+            (int(guild_id), role_id)
+        )
+        return True
+
+    # role_id=None clears every admin role of the guild
+    async def remove_admin_role(self, guild_id, role_id=None):
+        roles = self.get_admin_roles(guild_id)
+        if role_id is None:
+            if not roles:
+                return False
+            del self.admin_roles[int(guild_id)]
+            await self.db.execute("DELETE FROM admin_roles WHERE guild_id = ?", (int(guild_id),))
+            return True
+        if role_id not in roles:
+            return False
+        if len(roles) > 1:
+            self.admin_roles[int(guild_id)] = roles - {role_id}
+        else:
+            del self.admin_roles[int(guild_id)]
+        await self.db.execute(
+            "DELETE FROM admin_roles WHERE guild_id = ? AND role_id = ?",
+            (int(guild_id), role_id)
+        )
+        return True
+
+    # ——— Autopost schedules ———
+
+    def get_schedule(self, guild_id):
+        return dict(self.schedules.get(int(guild_id), {}))
+
+    # ——— Instagram subscriptions ———
+
+    def get_ig_accounts(self, guild_id):
+        return sorted(self.ig_accounts.get(int(guild_id), ()))
+
+    # Every account followed anywhere in the cluster; read from the table because
+    # processes running other shards add subscriptions this one never sees in memory
+    async def all_ig_accounts(self):
+        rows = await self.db.fetchall("SELECT DISTINCT username FROM ig_subscriptions")
+        return [username for (username,) in rows]
+
+    # username -> [guild_id, ...]; one entry per distinct followed account
+    def ig_followers(self):
+        followers = {}
+        for gid, usernames in self.ig_accounts.items():
+            for username in usernames:
+                followers.setdefault(username, []).append(gid)
+        return followers
+
+    async def add_ig_account(self, guild_id, username):
+        accounts = self.ig_accounts.setdefault(int(guild_id), set())
+        if username in accounts:
+            return False
+        accounts.add(username)
+        await self.db.execute(
+            "INSERT OR IGNORE INTO ig_subscriptions (guild_id, username) VALUES (?, ?)",
+            (int(guild_id), username)
+        )
+        return True
+
+    async def remove_ig_account(self, guild_id, username):
+        accounts = self.ig_accounts.get(int(guild_id), set())
+        if username not in accounts:
+            return False
+        accounts.discard(username)
+        if not accounts:
+            del self.ig_accounts[int(guild_id)]
+        await self.db.execute(
+            "DELETE FROM ig_subscriptions WHERE guild_id = ? AND username = ?",
+            (int(guild_id), username)
+        )
+        return True
@@ -0,0 +1,158 @@
+import asyncio, random, time
+
+from collections import deque
+
+from utils.ratelimit import PRIORITY_BACKGROUND
+
+# Shared buffers of memes and quotes. One batch request (meme-api /gimme/N,
+# zenquotes /quotes) fills a buffer that every guild draws from; each guild
+# keeps a short history of what it was sent, so it never gets a repeat even
+# though the buffer is shared. Upstream traffic depends on how fast the
+# buffer goes stale or is used up, not on how many guilds post from it.
+#
+# /meme and /quote pop items off the same buffers so they answer from memory;
+# dropping below the low-water mark starts a background refill, and only an
+# empty buffer makes a command wait on the network.
+
+MEME_BATCH_URL = "https://meme-api.com/gimme/50"
+
+QUOTE_BATCH_URL = "https://zenquotes.io/api/quotes"
+
+# After a failed refill, keep serving the old buffer this long before retrying
+REFILL_RETRY = 60
+
+
+class History:
+
+    # Bounded set of recently delivered item keys, oldest forgotten first
+    def __init__(self, maxlen=200):
+        self._order = deque()
+        self._keys = set()
+        self.maxlen = maxlen
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        if key in self._keys:
+            return
+        self._order.append(key)
+        self._keys.add(key)
+        while len(self._order) > self.maxlen:
+            self._keys.discard(self._order.popleft())
+
+
+class ContentBuffer:
+
+    def __init__(self, http_client, url, parse, key, maxsize=200, ttl=1800, low_water=10):
+        self.http_client = http_client
+        self.url = url
+        self.parse = parse  # batch JSON -> [item, ...]
+        self.key = key      # item -> stable ID used for de-duplication
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.low_water = low_water
+        self.items = deque(maxlen=maxsize)
+        self.loaded_at = 0.0
+        self.fetches = 0
+        self.hits = 0       # pop() answered from the buffer
+        self.misses = 0     # pop() had to wait for a refill
+        self.latencies = deque(maxlen=50)  # recent refill durations in seconds
+        self._task = None
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def stale(self):
+        return time.monotonic() - self.loaded_at > self.ttl
+
+    async def refill(self):
+        started = time.monotonic()
+        data = await self.http_client.get_json(self.url, priority=PRIORITY_BACKGROUND)
+        self.latencies.append(time.monotonic() - started)
+        self.fetches += 1
+        batch = self.parse(data) if data else []
+        if not batch:
+            print(f"[Content] ⚠️ Empty batch from {self.url}; keeping {len(self.items)} buffered items.")
+            if self.items:
+                self.loaded_at = time.monotonic() - self.ttl + REFILL_RETRY
+            return 0
+        known = {self.key(item) for item in self.items}
+        fresh = [item for item in batch if self.key(item) not in known]
+        self.items.extend(fresh)  # bounded: the oldest items fall off the front
+        self.loaded_at = time.monotonic()
+        return len(fresh)
+
+    # Start a refill unless one is already running
+    def schedule_refill(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.refill())
+        return self._task
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def _pick(self, history):
+        unseen = [item for item in self.items if self.key(item) not in history]
+        return random.choice(unseen) if unseen else None
+
+    # A buffered item this history has not seen; refills once if none is left
+    async def take(self, history=None):
+        history = history if history is not None else History()
+        if self.stale or not self.items:
+            await asyncio.shield(self.schedule_refill())
+        item = self._pick(history)
+        if item is None:
+            await asyncio.shield(self.schedule_refill())
+            item = self._pick(history)
+        if item is not None:
+            history.add(self.key(item))
+        return item
+
+
+    # Remove and return one item for a command; waits on the network only when empty
+    async def pop(self):
+        if self.items:
+            self.hits += 1
+        else:
+            self.misses += 1
+            await asyncio.shield(self.schedule_refill())
+        item = self.items.popleft() if self.items else None
+        if len(self.items) < self.low_water:
+            self.schedule_refill()
+        return item
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        served = self.hits + self.misses
+        return {
+            "size": len(self.items),
+            "maxsize": self.maxsize,
+            "fetches": self.fetches,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / served if served else 0.0,
+            "refill_p50": latencies[len(latencies) // 2] if latencies else None,
+            "refill_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        }
+
+
+def meme_buffer(http_client):
+    return ContentBuffer(
+        http_client, MEME_BATCH_URL,
+        parse=lambda data: data.get("memes") or [],
+        key=lambda meme: meme.get("postLink") or meme.get("url")
+    )
+
+
+def quote_buffer(http_client):
+    return ContentBuffer(
+        http_client, QUOTE_BATCH_URL,
+        parse=lambda data: data if isinstance(data, list) else [],
+        key=lambda quote: (quote.get("q"), quote.get("a"))
+    )
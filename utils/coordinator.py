@@ -0,0 +1,88 @@
+import json, time
+
+# Cluster coordination through the shared SQLite database, for deployments
+# that run several bot processes (each with its own shard range) on one host.
+#
+# - Leases: a named, expiring lock. The process holding the "mangadex" lease
+#   is the only one that polls MangaDex; the others skip the fetch. Renewing
+#   keeps the lease sticky, and a dead holder's lease simply times out; a
+#   restarted process reclaims its own lease at once, since the holder is
+#   its stable slice name rather than its PID.
+# - Outbox: the lease holder publishes new feed items once; every process
+#   reads them after its own cursor and delivers to its own guilds.
+#
+# A single-process bot is a cluster of one: it always wins the lease and
+# consumes everything it publishes.
+
+# Published items older than this are pruned
+OUTBOX_RETENTION = 86400
+
+
+class Coordinator:
+
+    def __init__(self, db, name="main"):
+        self.db = db
+        self.name = name  # stable per shard range; outbox cursors are keyed by it
+        self.holder = name  # one process per shard range, so the slice name identifies it across restarts
+        self.leading = set()  # lease names currently held
+
+    # Take the lease if it is free or expired, or renew it if we already hold it
+    async def acquire(self, lease, ttl):
+        now = time.time()
+        await self.db.execute(
+            "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+            "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+            (lease, self.holder, now + ttl, now)
+        )
+        row = await self.db.fetchone("SELECT holder FROM leases WHERE name = ?", (lease,))
+        held = bool(row) and row[0] == self.holder
+        if held:
+            self.leading.add(lease)
+        else:
+            self.leading.discard(lease)
+        return held
+
+    async def release(self, lease):
+        self.leading.discard(lease)
+        await self.db.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (lease, self.holder))
+
+    async def release_all(self):
+        for lease in list(self.leading):
+            await self.release(lease)
+
+    # items: [(item_id, payload dict)] in delivery order
+    async def publish(self, feed, items):
+        now = time.time()
+        await self.db.executemany(
+            "INSERT OR IGNORE INTO feed_outbox (feed, item_id, payload, created_at) VALUES (?, ?, ?, ?)",
+            [(feed, str(item_id), json.dumps(payload), now) for item_id, payload in items]
+        )
+        await self.db.execute(
+            "DELETE FROM feed_outbox WHERE feed = ? AND created_at < ?",
+            (feed, now - OUTBOX_RETENTION)
+        )
+
+    # Register this process as a consumer of the feed; call before anything can be published
+    # (cog_load), so items from the first poll are not skipped
+    async def init_cursor(self, feed):
+        key = f"outbox:{feed}:{self.name}"
+        cursor = await self.db.get_state(key)
+        if cursor is None:
+            # New consumer: start at the head instead of replaying the retention window
+            row = await self.db.fetchone("SELECT COALESCE(MAX(seq), 0) FROM feed_outbox WHERE feed = ?", (feed,))
+            cursor = str(row[0])
+            await self.db.set_state(key, cursor)
+        return int(cursor)
+
+    # Payloads published since this process's last consume, oldest first
+    async def consume(self, feed):
+        key = f"outbox:{feed}:{self.name}"
+        cursor = await self.init_cursor(feed)
+        rows = await self.db.fetchall(
+            "SELECT seq, payload FROM feed_outbox WHERE feed = ? AND seq > ? ORDER BY seq",
+            (feed, cursor)
+        )
+        if rows:
+            await self.db.set_state(key, str(rows[-1][0]))
+        return [json.loads(payload) for _, payload in rows]
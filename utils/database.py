@@ -0,0 +1,259 @@
+import asyncio, json, os, sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
+
+# SQLite storage for all persistent bot state. The connection lives on one
+# dedicated worker thread, so coroutines await queries without blocking the
+# event loop. WAL mode keeps reads cheap while a write is in progress.
+# Hot feed_state keys (cursors, last post IDs) can be written behind: repeated
+# writes of one key within the debounce window collapse into a single row
+# update, and everything pending is committed in one transaction.
+
+CONFIG_DIR = "config"
+
+DB_PATH = os.path.join(CONFIG_DIR, "bot.db")
+
+SCHEMA_VERSION = 2
+
+# Seconds a write-behind state value may wait before it is committed
+STATE_FLUSH_DELAY = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS guild_channels (
+    guild_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, kind)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS admin_roles (
+    guild_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, role_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS schedules (
+    guild_id INTEGER NOT NULL,
+    feed TEXT NOT NULL,
+    interval INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, feed)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS feed_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS seen_items (
+    feed TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (feed, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_items_age ON seen_items (feed, seen_at);
+CREATE TABLE IF NOT EXISTS ig_subscriptions (
+    guild_id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    PRIMARY KEY (guild_id, username)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feed_outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    feed TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (feed, item_id)
+);
+"""
+
+# Legacy JSON files imported once by the migration: (file, feed_state key)
+LEGACY_STATE_FILES = [
+    ("ig_last_post.json", "ig_last_post_id"),
+    ("mangadex_last_post.json", "mangadex_last_post_id"),
+]
+
+# The single account every guild followed before per-guild subscriptions
+LEGACY_IG_ACCOUNT = "xenon.otakus"
+
+
+def _read_json(directory, name):
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[DB] ⚠️ Skipping unreadable {path}: {e}")
+        return None
+
+
+class Database:
+
+    def __init__(self, path=DB_PATH, legacy_dir=CONFIG_DIR, flush_delay=STATE_FLUSH_DELAY):
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self.flush_delay = flush_delay
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = None
+        self._pending = {}  # feed_state key -> value not yet committed
+        self._flush_task = None   # debounce timer
+        self._flushing = None     # flush started by the timer, shielded from its cancellation
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        await self._run(self._open)
+
+    async def close(self):
+        # Cancelling only interrupts the debounce sleep; a flush already under way is awaited
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        if self._flushing and not self._flushing.done():
+            try:
+                await self._flushing
+            except Exception:
+                pass  # its values were put back; the flush below retries them
+        if self._conn is not None:
+            await self.flush()
+            await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Other shard processes may share this file; wait for their write locks instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs every commit; writes are few (state is coalesced, seen IDs batched), so the cost is small
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        version = int(row[0]) if row else 0
+        if version < 1:
+            self._migrate_json()
+        if version < 2:
+            self._migrate_ig_subscriptions()
+        if version < SCHEMA_VERSION:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        self._conn.commit()
+
+    def _close(self):
+        # Fold the WAL back into the main file so a clean shutdown leaves one self-contained database
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+        self._conn = None
+
+    # One-time import of the pre-SQLite config/*.json files
+    def _migrate_json(self):
+        conn = self._conn
+        channels = _read_json(self.legacy_dir, "autopost_config.json") or {}
+        conn.executemany(
+            "INSERT OR REPLACE INTO guild_channels (guild_id, kind, channel_id) VALUES (?, ?, ?)",
+            [(int(gid), kind, int(cid)) for gid, kinds in channels.items() for kind, cid in kinds.items()]
+        )
+        roles = _read_json(self.legacy_dir, "admin_roles.json") or {}
+        conn.executemany(
+            "INSERT OR REPLACE INTO admin_roles (guild_id, role_id) VALUES (?, ?)",
+            [(int(gid), int(rid)) for gid, rid in roles.items()]
+        )
+        schedules = _read_json(self.legacy_dir, "autopost_schedule.json") or {}
+        conn.executemany(
+            "INSERT OR REPLACE INTO schedules (guild_id, feed, interval) VALUES (?, ?, ?)",
+            [(int(gid), feed, int(sec)) for gid, feeds in schedules.items() for feed, sec in feeds.items()]
+        )
+        for name, key in LEGACY_STATE_FILES:
+            data = _read_json(self.legacy_dir, name) or {}
+            if data.get("last_post_id"):
+                conn.execute("INSERT OR REPLACE INTO feed_state (key, value) VALUES (?, ?)", (key, str(data["last_post_id"])))
+        print(f"[DB] 📦 Migrated {len(channels)} channel configs, {len(roles)} admin roles and {len(schedules)} schedules from JSON")
+
+    # v2: guilds with an Instagram channel keep following the legacy account,
+    # and its last post ID moves to the per-account state key
+    def _migrate_ig_subscriptions(self):
+        conn = self._conn
+        conn.execute(
+            "INSERT OR IGNORE INTO ig_subscriptions (guild_id, username) "
+            "SELECT guild_id, ? FROM guild_channels WHERE kind = 'insta_channel'",
+            (LEGACY_IG_ACCOUNT,)
+        )
+        conn.execute(
+            "UPDATE OR REPLACE feed_state SET key = ? WHERE key = 'ig_last_post_id'",
+            (f"ig_last_post_id:{LEGACY_IG_ACCOUNT}",)
+        )
+
+    def _execute(self, sql, params):
+        cur = self._conn.execute(sql, params)
+        self._conn.commit()
+        return cur.rowcount
+
+    def _executemany(self, sql, seq):
+        cur = self._conn.executemany(sql, seq)
+        self._conn.commit()
+        return cur.rowcount
+
+    def _execute_batch(self, statements):
+        with self._conn:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+
+    async def execute(self, sql, params=()):
+        return await self._run(self._execute, sql, params)
+
+    async def executemany(self, sql, seq):
+        return await self._run(self._executemany, sql, list(seq))
+
+    # Several statements committed as one transaction
+    async def execute_batch(self, statements):
+        await self._run(self._execute_batch, list(statements))
+
+    async def fetchone(self, sql, params=()):
+        return await self._run(lambda: self._conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self._run(lambda: self._conn.execute(sql, params).fetchall())
+
+    # ——— Small key/value state (last post IDs, cursors) ———
+
+    async def get_state(self, key, default=None):
+        if key in self._pending:
+            return self._pending[key]
+        row = await self.fetchone("SELECT value FROM feed_state WHERE key = ?", (key,))
+        return row[0] if row else default
+
+    async def set_state(self, key, value):
+        await self.execute("INSERT OR REPLACE INTO feed_state (key, value) VALUES (?, ?)", (key, value))
+
+    # Write-behind: returns immediately; the value is committed within flush_delay
+    def set_state_later(self, key, value):
+        self._pending[key] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        # Disarm before flushing: a write arriving mid-flush arms a fresh timer instead of waiting for the next burst
+        self._flush_task = None
+        self._flushing = asyncio.ensure_future(self.flush())
+        await asyncio.shield(self._flushing)
+
+    # Commit every pending write-behind value in one transaction
+    async def flush(self):
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            await self.executemany("INSERT OR REPLACE INTO feed_state (key, value) VALUES (?, ?)", pending.items())
+        except BaseException:
+            # Failed or cancelled: keep the values for the next flush unless newer ones arrived meanwhile
+            for key, value in pending.items():
+                self._pending.setdefault(key, value)
+            raise
+        return len(pending)
@@ -0,0 +1,41 @@
+import asyncio
+
+# Fans one autopost out to many guild channels concurrently. A semaphore
+# bounds how many sends are in flight across the whole bot, and sends to the
+# same channel (one Discord rate-limit route) are serialized so a busy
+# channel queues behind itself instead of burning retries. Failures are
+# collected per guild and never abort the rest of the fan-out.
+
+
+class Deliverer:
+
+    def __init__(self, concurrency=10):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._routes = {}  # channel_id -> [lock, users]
+
+    async def _send_one(self, guild, channel, send):
+        route = self._routes.setdefault(channel.id, [asyncio.Lock(), 0])
+        route[1] += 1
+        try:
+            async with route[0], self.semaphore:
+                await send(channel)
+            return None
+        except Exception as e:
+            return guild, e
+        finally:
+            route[1] -= 1
+            if not route[1]:
+                self._routes.pop(channel.id, None)
+
+    # targets: iterable of (guild, channel); send: async callable taking the channel
+    async def fan_out(self, targets, send, label="autopost"):
+        targets = list(targets)
+        if not targets:
+            return []
+        results = await asyncio.gather(*(self._send_one(guild, channel, send) for guild, channel in targets))
+        failures = [r for r in results if r]
+        if failures:
+            print(f"[Delivery] ⚠️ {label}: {len(failures)}/{len(targets)} deliveries failed")
+            for guild, error in failures:
+                print(f"[Delivery]    • {guild.name} ({guild.id}): {type(error).__name__}: {error}")
+        return failures
@@ -0,0 +1,130 @@
+import discord
+
+from utils.cache import TTLCache
+
+# Declarative embed templates shared by the manga and autopost cogs.
+# render_embed() builds an embed once per (template, content ID) and hands
+# the same object back afterwards, so one chapter posted to N guilds or one
+# manga shown to many users is only built once.
+
+# Discord embed field limits
+TITLE_LIMIT = 256
+
+DESCRIPTION_LIMIT = 4096
+
+FOOTER_LIMIT = 2048
+
+
+def clip(text, limit):
+    text = str(text or "")
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class EmbedTemplate:
+
+    __slots__ = ("color", "title", "description", "url", "image", "thumbnail", "footer")
+
+    # Every text field is a str.format pattern filled from the render fields
+    def __init__(self, color, title=None, description=None, url=None, image=None, thumbnail=None, footer=None):
+        self.color = color
+        self.title = title
+        self.description = description
+        self.url = url
+        self.image = image
+        self.thumbnail = thumbnail
+        self.footer = footer
+
+    @staticmethod
+    def _fill(pattern, fields):
+        return pattern.format_map(fields) if pattern else None
+
+    def render(self, fields):
+        embed = discord.Embed(
+            title=clip(self._fill(self.title, fields), TITLE_LIMIT) or None,
+            description=clip(self._fill(self.description, fields), DESCRIPTION_LIMIT) or None,
+            url=self._fill(self.url, fields) or None,
+            color=self.color
+        )
+        image = self._fill(self.image, fields)
+        if image:
+            embed.set_image(url=image)
+        thumbnail = self._fill(self.thumbnail, fields)
+        if thumbnail:
+            embed.set_thumbnail(url=thumbnail)
+        footer = self._fill(self.footer, fields)
+        if footer:
+            embed.set_footer(text=clip(footer, FOOTER_LIMIT))
+        return embed
+
+
+TEMPLATES = {
+    "manga": EmbedTemplate(
+        discord.Color.teal(),
+        title="{title}",
+        description="{synopsis}",
+        url="{url}",
+        image="{image_url}"
+    ),
+    "mangadex_chapter": EmbedTemplate(
+        discord.Color.blue(),
+        title="New Chapter: {manga_title} - Ch. {chapter}",
+        description="**Title:** {chapter_title}",
+        url="https://mangadex.org/chapter/{chapter_id}",
+        thumbnail="{cover_url}",
+        footer="Posted from MangaDex"
+    ),
+    "meme": EmbedTemplate(
+        discord.Color.purple(),
+        title="{title}",
+        url="{post_link}",
+        image="{image_url}",
+        footer="👍 {ups} • r/{subreddit}"
+    ),
+    "quote": EmbedTemplate(
+        discord.Color.gold(),
+        description='📜 *"{quote}"*\n\n— **{author}**'
+    ),
+    "instagram": EmbedTemplate(
+        discord.Color.orange(),
+        title="📸 New Post from @{username}",
+        description="{caption}",
+        url="https://www.instagram.com/p/{shortcode}/",
+        image="{image_url}",
+        footer="Instagram Auto-Post"
+    ),
+}
+
+_rendered = TTLCache(maxsize=1024, ttl=3600)
+
+
+# Memoized by (template, content_id); callers must not mutate the returned embed
+def render_embed(template, content_id, **fields):
+    key = (template, content_id)
+    embed = _rendered.get(key)
+    if embed is None:
+        embed = TEMPLATES[template].render({k: "" if v is None else v for k, v in fields.items()})
+        _rendered.set(key, embed)
+    return embed
+
+
+def embed_cache_stats():
+    return _rendered.stats()
+
+
+# meme-api item -> embed
+def meme_embed(data):
+    return render_embed(
+        "meme", data.get("postLink") or data.get("url"),
+        title=data.get("title", "Random Meme"),
+        post_link=data.get("postLink", ""),
+        image_url=data.get("url"),
+        ups=data.get("ups", 0),
+        subreddit=data.get("subreddit", "unknown")
+    )
+
+
+# zenquotes item -> embed
+def quote_embed(data):
+    quote = data.get("q", "No quote found.")
+    author = data.get("a", "Unknown")
+    return render_embed("quote", (quote, author), quote=quote, author=author)
@@ -0,0 +1,122 @@
+import asyncio, aiohttp
+
+from contextlib import asynccontextmanager
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from utils.ratelimit import RateLimiter, PRIORITY_INTERACTIVE, parse_retry_after
+
+from utils.singleflight import SingleFlight
+
+# Shared outbound HTTP client owned by the bot (see setup_hook in bot.py).
+# One pooled session means keep-alive connections, cached DNS and TLS
+# sessions are reused across every cog instead of per request.
+
+DEFAULT_USER_AGENT = "Manga-bot (+https://github.com/xenon401/Manga-bot)"
+
+# Backoff applied to a host that answers 429 without a Retry-After header
+DEFAULT_RETRY_AFTER = 5
+
+# Longest Retry-After we are willing to sit through before giving up
+MAX_RETRY_WAIT = 30
+
+
+# Canonical form of a URL for cache/coalescing keys: lowercase host,
+# sorted query, and case/whitespace-insensitive search terms
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    query = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key == "q":
+            value = " ".join(value.lower().split())
+        query.append((key, value))
+    query.sort()
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+
+class HttpClient:
+
+    def __init__(self, total_timeout=15, connect_timeout=5, limit=100, limit_per_host=10,
+                 dns_ttl=300, keepalive_timeout=30, rate_limits=None, retries=2):
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self.flights = SingleFlight()
+        self.limiter = RateLimiter(rate_limits)
+        self.retries = retries
+
+    async def start(self):
+        if self._session and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"User-Agent": DEFAULT_USER_AGENT}
+        )
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self):
+        if not self._session or self._session.closed:
+            raise RuntimeError("HttpClient used before start() or after close()")
+        return self._session
+
+    # Raw rate-limited request for callers that need status/headers (e.g. Instagram)
+    @asynccontextmanager
+    async def get(self, url, priority=PRIORITY_INTERACTIVE, **kwargs):
+        await self.limiter.acquire(url, priority)
+        async with self.session.get(url, **kwargs) as resp:
+            self._observe(url, resp)
+            yield resp
+
+    # Honour Retry-After on 429/503 by pausing the whole host
+    def _observe(self, url, resp):
+        if resp.status not in (429, 503):
+            return
+        delay = parse_retry_after(resp.headers.get("Retry-After"))
+        if delay is None:
+            if resp.status == 503:
+                return
+            delay = DEFAULT_RETRY_AFTER
+        self.limiter.block(url, delay)
+
+    # GET a JSON document; None on non-200 or network failure.
+    # Identical concurrent plain GETs are coalesced into one upstream request;
+    # pass coalesce=False for endpoints that return something new each call.
+    # Rate limited 429s are retried once the host's Retry-After has passed.
+    async def get_json(self, url, coalesce=True, priority=PRIORITY_INTERACTIVE, **kwargs):
+        if kwargs or not coalesce:
+            return await self._get_json(url, priority, **kwargs)
+        return await self.flights.do(normalize_url(url), lambda: self._get_json(url, priority))
+
+    async def _get_json(self, url, priority, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.get(url, priority, **kwargs) as resp:
+                    if resp.status == 200:
+                        return await resp.json(content_type=None)
+                    if resp.status != 429:
+                        if resp.status != 404:
+                            print(f"[HTTP] ❌ {resp.status} for {url}")
+                        return None
+                    delay = self.limiter.bucket(url).blocked_for
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[HTTP] ⚠️ {type(e).__name__} for {url}: {e}")
+                return None
+            if delay > MAX_RETRY_WAIT:
+                break
+        print(f"[HTTP] 🚫 Rate limited by {urlsplit(url).netloc}, giving up on {url}")
+        return None
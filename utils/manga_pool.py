@@ -0,0 +1,80 @@
+import asyncio, random, time
+
+from utils.records import MangaRecord
+
+# Prefetched pool of popular manga for /randommanga. Several pages of the
+# Jikan top lists are loaded in the background and indexed by genre, so a
+# random pick is an in-memory O(1) choice. Once the pool is older than its
+# TTL the next pick still answers from the old data and triggers a refresh
+# in the background (stale-while-revalidate).
+
+JIKAN_TOP_URL = "https://api.jikan.moe/v4/top/manga?type=manga&limit=25&page={page}"
+
+JIKAN_POPULAR_URL = "https://api.jikan.moe/v4/top/manga?type=manga&filter=bypopularity&limit=25&page={page}"
+
+
+class MangaPool:
+
+    def __init__(self, fetch, parse=MangaRecord.from_jikan, pages=4, ttl=6 * 3600):
+        self.fetch = fetch  # async url -> Jikan JSON (or None)
+        self.parse = parse  # raw Jikan entry -> MangaRecord
+        self.pages = pages
+        self.ttl = ttl
+        self.items = []
+        self.by_genre = {}  # lowercase genre -> [MangaRecord, ...]
+        self.loaded_at = 0.0
+        self._task = None
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def stale(self):
+        return time.monotonic() - self.loaded_at > self.ttl
+
+    def genres(self):
+        return sorted(self.by_genre)
+
+    async def refresh(self):
+        urls = [JIKAN_TOP_URL.format(page=p) for p in range(1, self.pages + 1)]
+        urls += [JIKAN_POPULAR_URL.format(page=p) for p in range(1, self.pages + 1)]
+        pages = await asyncio.gather(*(self.fetch(url) for url in urls))
+
+        items = {}
+        for data in pages:
+            for manga in (data or {}).get("data", []):
+                if manga["mal_id"] not in items:
+                    items[manga["mal_id"]] = self.parse(manga)
+        if not items:
+            print("[MangaPool] ⚠️ Refresh returned nothing; keeping the previous pool.")
+            return
+
+        by_genre = {}
+        for record in items.values():
+            for genre in record.genres:
+                by_genre.setdefault(genre, []).append(record)
+
+        # Swap in one step so readers never see a half-built pool
+        self.items, self.by_genre = list(items.values()), by_genre
+        self.loaded_at = time.monotonic()
+        print(f"[MangaPool] 🎲 Loaded {len(self.items)} manga across {len(self.by_genre)} genres.")
+
+    # Start a refresh unless one is already running
+    def schedule_refresh(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.refresh())
+        return self._task
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def ensure_loaded(self):
+        if not self.items:
+            await asyncio.shield(self.schedule_refresh())
+
+    def pick(self, genre=None):
+        if self.stale:
+            self.schedule_refresh()
+        pool = self.by_genre.get(genre.strip().lower(), []) if genre else self.items
+        return random.choice(pool) if pool else None
@@ -0,0 +1,120 @@
+import asyncio, heapq, itertools, time
+
+from email.utils import parsedate_to_datetime
+
+from urllib.parse import urlsplit
+
+# Per-upstream rate limiting. Each host gets a token bucket; callers that
+# have to wait queue by priority, so interactive slash commands are served
+# before background autopost loops.
+
+PRIORITY_INTERACTIVE = 0
+
+PRIORITY_BACKGROUND = 10
+
+# host -> (requests per second, burst)
+HOST_LIMITS = {
+    "api.jikan.moe": (1.0, 3),          # 3/s, 60/min
+    "api.mangadex.org": (4.0, 5),       # 5/s global
+    "meme-api.com": (1.0, 3),
+    "zenquotes.io": (5 / 30, 5),        # 5 per 30s
+    "www.instagram.com": (1 / 30, 2),
+}
+
+DEFAULT_LIMIT = (5.0, 5)
+
+
+# Seconds from a Retry-After header (delta-seconds or HTTP-date), or None
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._task = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority=PRIORITY_INTERACTIVE):
+        if not self._waiters and time.monotonic() >= self.blocked_until:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        await fut
+
+    # Stop handing out tokens for the given number of seconds (Retry-After)
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    @property
+    def blocked_for(self):
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    async def _run(self):
+        while self._waiters:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():  # caller gave up while queued
+                continue
+            self.tokens -= 1
+            fut.set_result(None)
+
+
+class RateLimiter:
+
+    def __init__(self, limits=None, default=DEFAULT_LIMIT):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets = {}
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.limits.get(host, self.default)
+            bucket = self._buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, url, priority=PRIORITY_INTERACTIVE):
+        await self.bucket(url).acquire(priority)
+
+    def block(self, url, seconds):
+        self.bucket(url).block(seconds)
+        print(f"[RateLimit] ⏳ {urlsplit(url).netloc} backing off for {seconds:.0f}s")
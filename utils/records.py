@@ -0,0 +1,61 @@
+# Slim records parsed from Jikan JSON. Only the fields the embeds and the
+# genre index use are kept; __slots__ drops the per-instance dict, so a
+# record is a small fraction of the raw payload it came from.
+
+# Tag lists on a Jikan manga entry that users may filter by
+GENRE_FIELDS = ("genres", "explicit_genres", "themes", "demographics")
+
+
+class MangaRecord:
+
+    __slots__ = ("mal_id", "title", "synopsis", "url", "image_url", "genres")
+
+    def __init__(self, mal_id, title, synopsis, url, image_url, genres=()):
+        self.mal_id = mal_id
+        self.title = title
+        self.synopsis = synopsis
+        self.url = url
+        self.image_url = image_url
+        self.genres = genres  # lowercase names
+
+    @classmethod
+    def from_jikan(cls, manga):
+        genres = []
+        for field in GENRE_FIELDS:
+            genres += [g["name"].lower() for g in manga.get(field) or []]
+        return cls(
+            manga["mal_id"],
+            manga.get("title") or "Unknown Title",
+            manga.get("synopsis") or "",
+            manga.get("url"),
+            (manga.get("images") or {}).get("jpg", {}).get("image_url", ""),
+            tuple(dict.fromkeys(genres))
+        )
+
+    def __repr__(self):
+        return f"<MangaRecord {self.mal_id} {self.title!r}>"
+
+
+class CharacterRecord:
+
+    __slots__ = ("name", "role", "image_url", "voice_actor")
+
+    def __init__(self, name, role, image_url, voice_actor):
+        self.name = name
+        self.role = role
+        self.image_url = image_url
+        self.voice_actor = voice_actor
+
+    @classmethod
+    def from_jikan(cls, entry):
+        char = entry.get("character") or {}
+        voice_actors = entry.get("voice_actors") or [{}]
+        return cls(
+            char.get("name", "Unknown"),
+            entry.get("role", "Unknown"),
+            (char.get("images") or {}).get("jpg", {}).get("image_url", ""),
+            (voice_actors[0].get("person") or {}).get("name", "—")
+        )
+
+    def __repr__(self):
+        return f"<CharacterRecord {self.name!r}>"
@@ -0,0 +1,108 @@
+import asyncio, heapq, itertools, random, time, zlib
+
+# One task that fires many independent periodic jobs (e.g. every guild's meme
+# and quote autoposts). Jobs sit in a heap ordered by their next deadline; the
+# runner sleeps until the earliest one, so a tick costs O(log n) however many
+# jobs there are. Rescheduling or removing a job leaves its old heap entry in
+# place and it is skipped when popped (lazy deletion).
+#
+# Start times are spread by a stable per-key phase so jobs with the same
+# interval do not all fire together, and each fire adds a little jitter so
+# they do not drift back into lockstep.
+
+# At startup, every job first fires within this many seconds (or its interval, if shorter)
+DEFAULT_SPREAD = 600
+
+
+def phase(key, window):
+    # Stable across restarts: the same key always lands at the same offset
+    return zlib.crc32(repr(key).encode()) / 2 ** 32 * window
+
+
+class Scheduler:
+
+    def __init__(self, fire, jitter=0.02, spread=DEFAULT_SPREAD):
+        self.fire = fire        # async callable taking the job key
+        self.jitter = jitter    # fraction of the interval added at random to each deadline
+        self.spread = spread
+        self._heap = []         # (deadline, token, key)
+        self._jobs = {}         # key -> (interval, token, deadline)
+        self._tokens = itertools.count()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._running = set()   # fire() tasks still in progress
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, key):
+        return key in self._jobs
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    # Seconds until the job next fires, or None if it is not scheduled
+    def next_in(self, key):
+        job = self._jobs.get(key)
+        return max(0.0, job[2] - time.monotonic()) if job else None
+
+    def _push(self, key, interval, deadline):
+        token = next(self._tokens)
+        self._jobs[key] = (interval, token, deadline)
+        heapq.heappush(self._heap, (deadline, token, key))
+        if self._heap[0][1] == token:
+            self._wake.set()  # new earliest deadline: let the runner re-arm its sleep
+
+    # Add a job or change its interval; delay=None spreads the first fire by the key's phase
+    def schedule(self, key, interval, delay=None):
+        if delay is None:
+            job = self._jobs.get(key)
+            if job and job[0] == interval:
+                return  # unchanged; keep the current deadline
+            delay = phase(key, min(interval, self.spread))
+        self._push(key, interval, time.monotonic() + delay)
+
+    def unschedule(self, key):
+        return self._jobs.pop(key, None) is not None
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        for task in self._running:
+            task.cancel()
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, token, key = heapq.heappop(self._heap)
+                job = self._jobs.get(key)
+                if job is None or job[1] != token:
+                    continue  # removed or rescheduled since this entry was pushed
+                interval = job[0]
+                # Next deadline follows the previous one (no drift), but never falls in the past
+                self._push(key, interval, max(deadline + interval, now) + random.uniform(0, self.jitter * interval))
+                task = asyncio.ensure_future(self._fire(key))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            # Nothing awaited above, so no schedule() can have slipped in before this clear
+            self._wake.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, key):
+        try:
+            await self.fire(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Scheduler] ⚠️ Job {key!r} failed: {type(e).__name__}: {e}")
@@ -0,0 +1,106 @@
+import re
+
+from collections import OrderedDict, Counter
+
+# Local fuzzy title index. Every title (main, English, Japanese, synonyms)
+# is split into padded character trigrams; a query is ranked by trigram
+# overlap (Jaccard) with a boost for prefix matches, so typos and partial
+# titles still find the right series without a network call. The index is
+# bounded: the least recently added/used document is evicted first.
+
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def normalize_title(text):
+    return " ".join(_PUNCT.sub(" ", text.lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+
+    def __init__(self, maxsize=2000):
+        self.maxsize = maxsize
+        self._docs = OrderedDict()  # doc_id -> (titles, payload); titles = [(display, norm, grams)]
+        self._postings = {}         # trigram -> {(doc_id, title_no), ...}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def get(self, doc_id):
+        doc = self._docs.get(doc_id)
+        return doc[1] if doc else None
+
+    def add(self, doc_id, titles, payload=None):
+        entries = []
+        seen = set()
+        for title in titles:
+            norm = normalize_title(title or "")
+            # Also index the spaceless form so "onepeice" still finds "One Piece"
+            for form in (norm, norm.replace(" ", "")):
+                if form and form not in seen:
+                    seen.add(form)
+                    entries.append((title, form, trigrams(form)))
+        if not entries:
+            return
+        old = self._docs.get(doc_id)
+        if old and payload is None:
+            payload = old[1]  # a title-only sighting must not drop a richer payload
+        self.remove(doc_id)
+        self._docs[doc_id] = (entries, payload)
+        for no, (_, _, grams) in enumerate(entries):
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add((doc_id, no))
+        while len(self._docs) > self.maxsize:
+            self.remove(next(iter(self._docs)))
+
+    def remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if not doc:
+            return
+        for no, (_, _, grams) in enumerate(doc[0]):
+            for gram in grams:
+                bucket = self._postings.get(gram)
+                if bucket is not None:
+                    bucket.discard((doc_id, no))
+                    if not bucket:
+                        del self._postings[gram]
+
+    # Ranked [(score, doc_id, title, payload)], best first, score in 0..1
+    def search(self, query, limit=10, min_score=0.3):
+        norm = normalize_title(query or "")
+        if not norm:
+            return []
+        grams = trigrams(norm)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        best = {}
+        for (doc_id, no), count in shared.items():
+            title, title_norm, title_grams = self._docs[doc_id][0][no]
+            if title_norm == norm:
+                score = 1.0
+            else:
+                score = count / (len(grams) + len(title_grams) - count)
+                if title_norm.startswith(norm):
+                    score = max(score, 0.7 + 0.25 * len(norm) / len(title_norm))
+            if score >= min_score and score > best.get(doc_id, (0,))[0]:
+                best[doc_id] = (score, title)
+
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        results = []
+        for doc_id, (score, title) in ranked:
+            self._docs.move_to_end(doc_id)
+            results.append((score, doc_id, title, self._docs[doc_id][1]))
+        return results
+
+    def best(self, query, min_score=0.3):
+        results = self.search(query, limit=1, min_score=min_score)
+        return results[0] if results else None
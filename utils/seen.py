@@ -0,0 +1,58 @@
+import time
+
+from collections import OrderedDict
+
+# Bounded, time-windowed set of item IDs a feed has already delivered.
+# Membership checks are O(1) against memory; every add is also written to
+# the seen_items table so the set survives restarts.
+
+
+class SeenSet:
+
+    def __init__(self, db, feed, maxlen=5000, window=14 * 86400):
+        self.db = db
+        self.feed = feed
+        self.maxlen = maxlen
+        self.window = window
+        self._items = OrderedDict()  # item_id -> seen_at (oldest first)
+        self._adds = 0
+
+    def __contains__(self, item_id):
+        seen_at = self._items.get(item_id)
+        return seen_at is not None and seen_at > time.time() - self.window
+
+    def __len__(self):
+        return len(self._items)
+
+    async def load(self):
+        rows = await self.db.fetchall(
+            "SELECT item_id, seen_at FROM seen_items WHERE feed = ? AND seen_at > ? ORDER BY seen_at DESC LIMIT ?",
+            (self.feed, time.time() - self.window, self.maxlen)
+        )
+        self._items = OrderedDict((item_id, seen_at) for item_id, seen_at in reversed(rows))
+        return self
+
+    async def add(self, item_id):
+        await self.add_many([item_id])
+
+    async def add_many(self, item_ids):
+        now = time.time()
+        for item_id in item_ids:
+            self._items[item_id] = now
+            self._items.move_to_end(item_id)
+        while len(self._items) > self.maxlen:
+            self._items.popitem(last=False)
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO seen_items (feed, item_id, seen_at) VALUES (?, ?, ?)",
+            [(self.feed, item_id, now) for item_id in item_ids]
+        )
+        before, self._adds = self._adds, self._adds + len(item_ids)
+        if before // 500 != self._adds // 500:
+            await self.prune()
+
+    # Drop rows that fell out of the time window
+    async def prune(self):
+        await self.db.execute(
+            "DELETE FROM seen_items WHERE feed = ? AND seen_at <= ?",
+            (self.feed, time.time() - self.window)
+        )
@@ -0,0 +1,30 @@
+# Shard helpers. Discord routes a guild to shard (guild_id >> 22) % shard_count;
+# a process started with SHARD_IDS only sees those shards' guilds, so per-guild
+# work (autopost schedules, feed deliveries) must be limited to them as well.
+
+
+def shard_for(guild_id, shard_count):
+    return (int(guild_id) >> 22) % shard_count
+
+
+# "0-3,8" -> [0, 1, 2, 3, 8]; empty -> None (all shards)
+def parse_shard_ids(spec):
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    ids = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ids.update(range(int(start), int(end) + 1))
+        elif part:
+            ids.add(int(part))
+    return sorted(ids)
+
+
+# Stable name for this process's slice of the cluster, used for outbox cursors
+def cluster_name(shard_ids):
+    if not shard_ids:
+        return "main"
+    return "shards-" + "_".join(map(str, shard_ids))
@@ -0,0 +1,31 @@
+import asyncio
+
+# Request coalescing: concurrent callers asking for the same key share one
+# in-flight task instead of each starting their own.
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls = {}
+        self.shared = 0  # callers that joined an existing flight
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.shared += 1
+        # shield: one impatient caller being cancelled must not cancel the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away